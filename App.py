@@ -1,12 +1,22 @@
-import cv2
 import numpy as np
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import filedialog
-from PIL import Image, ImageTk
+from FramePipeline import FramePipeline
+from FrameRenderer import FrameRenderer
+from IncrementalSolver import IncrementalSolver
+from DigitClassifier import loadDigitClassifier
+from LazyImport import lazyImport
+from OcrRecovery import OcrRecovery
+from Profiler import StageProfiler, startupProfiler
 from PuzzleFinder import PuzzleFinder
+from RecognitionCache import RecognitionCache
+from SolutionCache import SolutionCache
 from SudokuSolver import SudokuSolver
-from tensorflow.keras.models import load_model
+
+cv2 = lazyImport("cv2")
+Image = lazyImport("PIL.Image")
+ImageTk = lazyImport("PIL.ImageTk")
 
 
 class App:
@@ -19,12 +29,23 @@ class App:
     __tutorialButton = None
     __cells = None
     __intVars = None
+    __incrementalSolver = None
+    __shownSolution = None
+    __clearedCells = None
+    __pendingSolve = None
+    __updatingGrid = False
 
     # Webcam window widgets
     __webcamWindow = None
     __webcamLabel = None
+    __frameRenderer = None
     __vc = None
     __digitReader = None
+    __framePipeline = None
+    __webcamOverlay = None
+    __webcamSolution = None
+    __stageProfiler = None
+    __showStageTimes = True
 
     # Upload window widgets & data
     __uploadWindow = None
@@ -52,6 +73,8 @@ class App:
     # Helper Classes
     __puzzleFinder = None
     __sudokuSolver = None
+    __solutionCache = None
+    __ocrRecovery = None
 
     # Colors
     LIGHT_RED = "#ff6363"
@@ -60,10 +83,20 @@ class App:
     BACKGROUND_COLOR = "light gray"
 
     def __init__(self):
-        # Load digit reader
-        self.__digitReader = load_model("model/digitReader.h5")
+        self.__solutionCache = SolutionCache()
+        self.__ocrRecovery = OcrRecovery(timeBudget=0.5)
+        self.__incrementalSolver = IncrementalSolver()
+        self.__clearedCells = set()
 
         # Create GUI main window
+        with startupProfiler.measure("create main window"):
+            self.__createMainWindow()
+
+        # Launch the Tkinter GUI
+        self.__mainWindow.after_idle(startupProfiler.ready)
+        self.__mainWindow.mainloop()
+
+    def __createMainWindow(self):
         self.__mainWindow = tk.Tk()
         self.__mainWindow.title("Sudoku Solver CV")
         self.__mainWindow.geometry("%dx%d+%d+%d" % (540, 540, 50, 50))
@@ -99,6 +132,7 @@ class App:
                 cell["justify"] = tk.CENTER
                 cell["highlightthickness"] = 0
                 cell["textvariable"] = var
+                var.trace_add("write", lambda *args, row=i // 40, col=j // 40: self.__onCellEdited(row, col))
                 cell.place(width=40-step, height=40-step, x=j, y=i)
                 self.__cells[i // 40, j // 40] = cell
                 self.__intVars[i // 40, j // 40] = var
@@ -134,18 +168,9 @@ class App:
         self.__tutorialButton["highlightthickness"] = 0
         self.__tutorialButton.place(width=36, height=36, relx=0.9, rely=0.90, anchor=tk.CENTER)
 
-        # Tutorial Data
-        self.__images = [None] * self.__numPages
+        # Tutorial Data, the images are read when the tutorial is first opened
         self.__subtitles = [""] * self.__numPages
 
-        self.__images[0] = cv2.imread("images/image1.png")
-        self.__images[1] = cv2.imread("images/image2.png")
-        self.__images[2] = cv2.imread("images/image3.png")
-        self.__images[3] = cv2.imread("images/image4.png")
-        self.__images[4] = cv2.imread("images/image5.png")
-        self.__images[5] = cv2.imread("images/image6.png")
-        self.__images[6] = cv2.imread("images/image7.png")
-
         self.__subtitles[0] = "1. Click on 'Launch Webcam' to open the webcam for\nreading an unsolved Sudoku puzzle."
         self.__subtitles[1] = "2. Hold up the Sudoku puzzle in front of the webcam."
         self.__subtitles[2] = "3. Move the Sudoku puzzle closer when prompted to."
@@ -156,37 +181,135 @@ class App:
 
         self.__tutorialTextVar = tk.StringVar()
 
-        # Launch the Tkinter GUI
-        self.__mainWindow.mainloop()
+    def __getDigitReader(self):
+        # Load digit reader on first use
+        if self.__digitReader is None:
+            with startupProfiler.measure("load digit reader"):
+                self.__digitReader = loadDigitClassifier("model/digitReader.npz")
+        return self.__digitReader
+
+    def __loadTutorialImages(self):
+        if self.__images is None:
+            with startupProfiler.measure("load tutorial images"):
+                self.__images = [cv2.imread("images/image%d.png" % (i + 1)) for i in range(self.__numPages)]
 
     def __updateGrid(self, sudokuGrid, newCoordinates):
-        for i in range(9):
-            for j in range(9):
-                self.__intVars[i, j].set(sudokuGrid[i, j])
-                self.__cells[i, j]["bg"] = self.LIGHT_GREEN if (i, j) in newCoordinates else self.WHITE
+        self.__updatingGrid = True
+        try:
+            for i in range(9):
+                for j in range(9):
+                    self.__intVars[i, j].set(sudokuGrid[i, j])
+                    self.__cells[i, j]["bg"] = self.LIGHT_GREEN if (i, j) in newCoordinates else self.WHITE
+        finally:
+            self.__updatingGrid = False
+
+        # the solved squares are not givens, edits are checked against the rest
+        givens = np.array(sudokuGrid)
+        for i, j in newCoordinates:
+            givens[i, j] = 0
+        self.__incrementalSolver.load(givens)
+        self.__shownSolution = np.array(sudokuGrid)
+        self.__clearedCells = set()
 
     def __showIllegalGrid(self, sudokuGrid, conflicts):
-        for i in range(9):
-            for j in range(9):
-                if sudokuGrid[i, j] != 0:
-                    self.__intVars[i, j].set(sudokuGrid[i, j])
-                    self.__cells[i, j]["bg"] = self.LIGHT_RED if (i, j) in conflicts else self.WHITE
+        self.__updatingGrid = True
+        try:
+            for i in range(9):
+                for j in range(9):
+                    if sudokuGrid[i, j] != 0:
+                        self.__intVars[i, j].set(sudokuGrid[i, j])
+                        self.__cells[i, j]["bg"] = self.LIGHT_RED if (i, j) in conflicts else self.WHITE
+        finally:
+            self.__updatingGrid = False
+        self.__incrementalSolver.load(sudokuGrid)
+        self.__shownSolution = None
+        self.__clearedCells = set()
 
     def __clearGrid(self):
-        for i in range(9):
-            for j in range(9):
-                self.__intVars[i, j].set("")
-                self.__cells[i, j]['bg'] = "white"
+        self.__updatingGrid = True
+        try:
+            for i in range(9):
+                for j in range(9):
+                    self.__intVars[i, j].set("")
+                    self.__cells[i, j]['bg'] = "white"
+        finally:
+            self.__updatingGrid = False
+        self.__incrementalSolver.load(np.zeros((9, 9), dtype=int))
+        self.__shownSolution = None
+        self.__clearedCells = set()
+
+    def __onCellEdited(self, row, col):
+        # a digit typed into the grid becomes a given, only the cells whose state it changed are redrawn
+        if self.__updatingGrid:
+            return None
+        # the typed digit is the one that differs from the square's previous digit, wherever the cursor was
+        previous = self.__incrementalSolver.getCell(row, col)
+        digits = [int(ch) for ch in self.__cells[row, col].get() if ch in "123456789"]
+        typed = [digit for digit in digits if digit != previous]
+        value = typed[-1] if typed else (previous if digits else 0)
+        changed = self.__incrementalSolver.setCell(row, col, value)
+
+        # a square the user emptied stays empty instead of being filled in again with the solution
+        if value == 0:
+            self.__clearedCells.add((row, col))
+        else:
+            self.__clearedCells.discard((row, col))
+
+        self.__updatingGrid = True
+        try:
+            if self.__cells[row, col].get() != (str(value) if value else ""):
+                self.__intVars[row, col].set(value if value else "")
+            for i, j in changed | {(row, col)}:
+                self.__drawCell(i, j)
+        finally:
+            self.__updatingGrid = False
+
+        # solving again waits until Tk is idle, so fast typing is solved once
+        if self.__pendingSolve is not None:
+            self.__mainWindow.after_cancel(self.__pendingSolve)
+        self.__pendingSolve = self.__mainWindow.after_idle(self.__showLiveSolution)
+
+    def __showLiveSolution(self):
+        self.__pendingSolve = None
+        solution = self.__incrementalSolver.getSolution()
+        if solution is self.__shownSolution:
+            return None
+
+        self.__shownSolution = solution
+        self.__updatingGrid = True
+        try:
+            for i in range(9):
+                for j in range(9):
+                    if self.__incrementalSolver.getCell(i, j) == 0:
+                        self.__drawCell(i, j)
+        finally:
+            self.__updatingGrid = False
+
+    def __drawCell(self, row, col):
+        if self.__incrementalSolver.getCell(row, col) != 0:
+            self.__cells[row, col]["bg"] = self.LIGHT_RED if self.__incrementalSolver.hasConflict(row, col) else self.WHITE
+        elif self.__shownSolution is not None and (row, col) not in self.__clearedCells:
+            self.__intVars[row, col].set(self.__shownSolution[row, col])
+            self.__cells[row, col]["bg"] = self.LIGHT_GREEN
+        else:
+            self.__intVars[row, col].set("")
+            self.__cells[row, col]["bg"] = self.WHITE
 
     def __killMainWin(self):
         # destroy the main window
         self.__mainWindow.destroy()
         self.__mainWindow.quit()
 
+    def __toggleStageTimes(self):
+        self.__showStageTimes = not self.__showStageTimes
+
     def __killWebcamWin(self):
         # reactivate buttons on main window
         self.__toggleMainMenuButtons("normal")
 
+        # stop the capture and recognition threads before releasing the webcam
+        self.__framePipeline.stop()
+
         # destroy the webcam window
         self.__webcamWin.destroy()
         self.__webcamWin.quit()
@@ -240,12 +363,25 @@ class App:
             self.__webcamWin.resizable(False, False)
             self.__webcamWin.configure(background=self.BACKGROUND_COLOR)
             self.__webcamWin.bind('<Escape>', lambda w: self.__killWebcamWin())
+            self.__webcamWin.bind('<p>', lambda w: self.__toggleStageTimes())
             self.__webcamWin.protocol("WM_DELETE_WINDOW", self.__killWebcamWin)
             self.__webcamLabel = tk.Label(self.__webcamWin)
             self.__webcamLabel.pack()
-
-            self.__puzzleFinder = PuzzleFinder(img, self.__digitReader)
-            self.__sudokuSolver = SudokuSolver()
+            self.__frameRenderer = FrameRenderer(self.__webcamLabel)
+
+            # Recognition runs on its own thread with its own finder and solver
+            stageProfiler = StageProfiler()
+            puzzleFinder = PuzzleFinder(img, self.__getDigitReader(), stageProfiler)
+            sudokuSolver = SudokuSolver(solutionCache=self.__solutionCache)
+            recognitionCache = RecognitionCache()
+            ocrRecovery = OcrRecovery()
+            self.__stageProfiler = stageProfiler
+            self.__webcamOverlay = []
+            self.__webcamSolution = None
+            self.__framePipeline = FramePipeline(
+                self.__vc,
+                lambda frame: self.__recognizeFrame(puzzleFinder, sudokuSolver, recognitionCache, ocrRecovery, stageProfiler, frame))
+            self.__framePipeline.start()
             self.__showFrame()
             self.__webcamWin.mainloop()
 
@@ -253,47 +389,94 @@ class App:
             self.__vc.release()
             self.__showWebcamError()
 
+    @staticmethod
+    def __recognizeFrame(puzzleFinder, sudokuSolver, recognitionCache, ocrRecovery, stageProfiler, img):
+        # Get grid contour (if none is found, continue to next frame)
+        puzzleFinder.updateImage(img)
+        hasGrid = puzzleFinder.getGridCornersWeb(draw=False, track=True)
+        overlay = puzzleFinder.getOverlay()
+        if not hasGrid:
+            return overlay, None
+
+        # Reuse the last result while the grid has not moved or changed
+        puzzleFinder.extractGridFromCorners()
+        with stageProfiler.stage("cache"):
+            solution = recognitionCache.lookup(puzzleFinder.getGridCorners(), puzzleFinder.getPuzzleImage())
+        if solution is not None:
+            return overlay, solution
+
+        # Extract puzzle and solve it
+        sudokuPuzzle, blankSquares = puzzleFinder.analyzeSquares()
+
+        # Solve the puzzle only if all constraints are met
+        solution = None
+        with stageProfiler.stage("validate"):
+            valid = sudokuSolver.isValidPuzzle(sudokuPuzzle)
+        if valid:
+            sudokuSolver.setGrid(sudokuPuzzle)
+            with stageProfiler.stage("solve"):
+                solved = sudokuSolver.solveSudoku()
+            if solved:
+                solution = (True, sudokuPuzzle, blankSquares)
+
+        # A misread digit is likely, try the reader's runner-up digits before giving up on this frame
+        if solution is None:
+            with stageProfiler.stage("recover"):
+                recovered = App.__recoverPuzzle(puzzleFinder, sudokuSolver, ocrRecovery, sudokuPuzzle, blankSquares)
+            if recovered is not None:
+                solution = (True,) + recovered
+
+        if solution is None:
+            with stageProfiler.stage("validate"):
+                conflicts = sudokuSolver.getAllConflicts(sudokuPuzzle)
+            solution = (False, sudokuPuzzle, conflicts)
+
+        # only solved reads are reused, a failed read is tried again on the next frame instead of staying on screen
+        if solution[0]:
+            recognitionCache.store(solution)
+        return overlay, solution
+
     def __showFrame(self):
-        # Read and preprocess frame
-        success, img = self.__vc.read()
-        if not success:
+        if self.__framePipeline.hasFailed():
             self.__killWebcamWin()
             self.__showWebcamError()
             return None
 
-        # Get grid contour (if none is found, continue to next frame)
-        self.__puzzleFinder.updateImage(img)
-        hasGrid = self.__puzzleFinder.getGridCornersWeb()
-
-        # If contour is found, extract the puzzle from the image and solve the puzzle
-        if hasGrid:
-            # Extract puzzle and solve it
-            self.__puzzleFinder.extractGridFromCorners()
-            sudokuPuzzle, blankSquares = self.__puzzleFinder.analyzeSquares()
-
-            # Solve the puzzle only if all constraints are met
-            if self.__sudokuSolver.isValidPuzzle(sudokuPuzzle):
-                self.__sudokuSolver.setGrid(sudokuPuzzle)
-                if self.__sudokuSolver.solveSudoku():
-                    self.__clearGrid()
-                    self.__updateGrid(sudokuPuzzle, blankSquares)
-                else:
-                    conflicts = self.__sudokuSolver.getAllConflicts(sudokuPuzzle)
-                    self.__clearGrid()
-                    self.__showIllegalGrid(sudokuPuzzle, conflicts)
-            else:
-                conflicts = self.__sudokuSolver.getAllConflicts(sudokuPuzzle)
+        # Update the grid with the latest recognition result
+        result = self.__framePipeline.getResult()
+        if result is not None:
+            self.__webcamOverlay, solution = result
+            if solution is not None and solution is not self.__webcamSolution:
+                self.__webcamSolution = solution
+                solved, sudokuPuzzle, cells = solution
                 self.__clearGrid()
-                self.__showIllegalGrid(sudokuPuzzle, conflicts)
+                if solved:
+                    self.__updateGrid(sudokuPuzzle, cells)
+                else:
+                    self.__showIllegalGrid(sudokuPuzzle, cells)
 
-        # Display next image onto webcam window
-        cv2Img = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
-        webcamImg = Image.fromarray(cv2Img)
-        imgtk = ImageTk.PhotoImage(image=webcamImg)
-        self.__webcamLabel.imgtk = imgtk
-        self.__webcamLabel.configure(image=imgtk)
+        # Display the newest frame with the latest overlay onto webcam window
+        img = self.__framePipeline.getFrame()
+        if img is not None:
+            self.__frameRenderer.render(img, self.__drawWebcamOverlay)
         self.__webcamLabel.after(10, self.__showFrame)
 
+    def __drawWebcamOverlay(self, buffer):
+        # Drawn into the renderer's RGBA buffer, the captured frame itself is left untouched
+        black, white = FrameRenderer.toBufferColor((0, 0, 0)), FrameRenderer.toBufferColor((255, 255, 255))
+        PuzzleFinder.drawOverlay(buffer, self.__webcamOverlay, rgba=True)
+        fps = self.__framePipeline.getFps()
+        fpsText = "capture %.1f  recognition %.1f  display %.1f fps" % (fps["capture"], fps["recognition"], fps["display"])
+        cv2.putText(buffer, fpsText, (10, 24), cv2.FONT_HERSHEY_DUPLEX, 0.6, black, 6)
+        cv2.putText(buffer, fpsText, (10, 24), cv2.FONT_HERSHEY_DUPLEX, 0.6, white, 1)
+
+        # Rolling latency of every recognition stage, toggled with the P key
+        if self.__showStageTimes:
+            for i, line in enumerate(self.__stageProfiler.formatLines()):
+                origin = (10, 48 + 18 * i)
+                cv2.putText(buffer, line, origin, cv2.FONT_HERSHEY_PLAIN, 1, black, 4)
+                cv2.putText(buffer, line, origin, cv2.FONT_HERSHEY_PLAIN, 1, white, 1)
+
     def __uploadImage(self):
         # ask the user for an image file
         filePath = filedialog.askopenfilename()
@@ -317,8 +500,8 @@ class App:
             return None
 
         # get the grid contour and vertices
-        self.__puzzleFinder = PuzzleFinder(self.__uploadCurrentImage, self.__digitReader)
-        self.__sudokuSolver = SudokuSolver()
+        self.__puzzleFinder = PuzzleFinder(self.__uploadCurrentImage, self.__getDigitReader())
+        self.__sudokuSolver = SudokuSolver(solutionCache=self.__solutionCache)
         contours = self.__puzzleFinder.getGridContours()
 
         # if no contours were calculated, stop
@@ -328,7 +511,7 @@ class App:
 
         # sort contours by largest area to smallest
         self.__uploadContourList = sorted(contours, key=cv2.contourArea, reverse=True)
-        self.__uploadContourSize = int(cv2.contourArea(self.__uploadContourList[0]) // 14e4)
+        self.__uploadContourSize = self.__puzzleFinder.getDisplayThickness()
 
         # open the upload window
         x, y = self.__mainWindow.winfo_x(), self.__mainWindow.winfo_y()
@@ -417,20 +600,42 @@ class App:
         sudokuPuzzle, blankSquares = self.__puzzleFinder.analyzeSquares()
 
         # Solve the puzzle only if all constraints are met
-        if self.__sudokuSolver.isValidPuzzle(sudokuPuzzle):
+        valid = self.__sudokuSolver.isValidPuzzle(sudokuPuzzle)
+        if valid:
             self.__sudokuSolver.setGrid(sudokuPuzzle)
             if self.__sudokuSolver.solveSudoku():
                 self.__clearGrid()
                 self.__updateGrid(sudokuPuzzle, blankSquares)
-            else:
-                self.__impossiblePuzzleError()
+                return None
+
+        # Otherwise some digit was probably misread
+        recovered = self.__recoverPuzzle(self.__puzzleFinder, self.__sudokuSolver, self.__ocrRecovery, sudokuPuzzle, blankSquares)
+        if recovered is not None:
+            self.__clearGrid()
+            self.__updateGrid(*recovered)
+        elif valid:
+            self.__impossiblePuzzleError()
         else:
             conflicts = self.__sudokuSolver.getAllConflicts(sudokuPuzzle)
             self.__clearGrid()
             self.__showIllegalGrid(sudokuPuzzle, conflicts)
             self.__showIllegalConstraintsError()
 
+    @staticmethod
+    def __recoverPuzzle(puzzleFinder, sudokuSolver, ocrRecovery, sudokuPuzzle, blankSquares):
+        recovered = ocrRecovery.recover(sudokuPuzzle, *puzzleFinder.getTopDigits())
+        if recovered is None:
+            return None
+
+        # squares corrected to 0 were blank all along and are filled in by the solver
+        correctedPuzzle, corrections = recovered
+        sudokuSolver.setGrid(correctedPuzzle)
+        sudokuSolver.solveSudoku()
+        return correctedPuzzle, blankSquares | {(row, col) for row, col, digit in corrections if digit == 0}
+
     def __showInfo(self):
+        self.__loadTutorialImages()
+
         # Create a child window that will contain the tutorial
         x, y = self.__mainWindow.winfo_x(), self.__mainWindow.winfo_y()
         self.__tutorialWindow = tk.Toplevel(self.__mainWindow)
@@ -0,0 +1,206 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from DigitClassifier import loadDigitClassifier
+from OcrRecovery import OcrRecovery
+from Profiler import StageProfiler
+from PuzzleCorpus import formatPuzzle
+from PuzzleFinder import PuzzleFinder
+from SudokuSolver import SudokuSolver
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+CSV_FIELDS = ("image", "status", "givens", "solution", "corrections", "load_ms", "detect_ms", "recognize_ms", "solve_ms", "total_ms")
+
+
+class BatchSolver:
+    __digitReader = None
+    __sudokuSolver = None
+    __contourMode = None
+    __profiler = None
+    __ocrRecovery = None
+
+    def __init__(self, digitReader, engine="bitmask", contourMode="largest-quad", profiler=None, recoveryBudget=0.2):
+        self.__digitReader = digitReader
+        self.__sudokuSolver = SudokuSolver(engine=engine)
+        self.__contourMode = contourMode
+        self.__profiler = profiler if profiler is not None else StageProfiler(enabled=False)
+        if recoveryBudget > 0:
+            self.__ocrRecovery = OcrRecovery(recoveryBudget, engine=engine)
+
+    def solveImage(self, path):
+        # read the image from the file path
+        return self.__solve(path, lambda: cv2.imread(path))
+
+    def solveEncodedImage(self, data, name="upload"):
+        # decode an image file that is already in memory
+        return self.__solve(name, lambda: cv2.imdecode(np.frombuffer(data, dtype="uint8"), cv2.IMREAD_COLOR))
+
+    def __solve(self, name, loadImage):
+        result = {"image": name, "status": None, "givens": None, "solution": None, "corrections": None, "timings": {}}
+        timings = result["timings"]
+        start = time.perf_counter()
+
+        image = loadImage()
+        timings["load_ms"] = (time.perf_counter() - start) * 1000
+        if image is None:
+            result["status"] = "unreadable"
+            return self.__finish(result, start)
+
+        # find the grid outline
+        tick = time.perf_counter()
+        puzzleFinder = PuzzleFinder(image, self.__digitReader, self.__profiler)
+        with self.__profiler.stage("detect"):
+            found = self.__findGrid(puzzleFinder)
+        timings["detect_ms"] = (time.perf_counter() - tick) * 1000
+        if not found:
+            result["status"] = "no_grid"
+            return self.__finish(result, start)
+
+        # extract the grid and read the digits
+        tick = time.perf_counter()
+        puzzleFinder.extractGridFromCorners()
+        sudokuPuzzle, _ = puzzleFinder.analyzeSquares()
+        timings["recognize_ms"] = (time.perf_counter() - tick) * 1000
+        result["givens"] = formatPuzzle(sudokuPuzzle)
+
+        # solve the puzzle only if all constraints are met
+        tick = time.perf_counter()
+        with self.__profiler.stage("validate"):
+            valid = SudokuSolver.isValidPuzzle(sudokuPuzzle)
+        if not valid:
+            result["status"] = "invalid"
+        else:
+            self.__sudokuSolver.setGrid(sudokuPuzzle)
+            with self.__profiler.stage("solve"):
+                solved = self.__sudokuSolver.solveSudoku()
+            if solved:
+                result["status"] = "solved"
+                result["solution"] = formatPuzzle(sudokuPuzzle)
+            else:
+                result["status"] = "unsolvable"
+
+        # retry with the reader's runner-up digits of the least confident squares
+        if result["status"] != "solved" and self.__ocrRecovery is not None:
+            with self.__profiler.stage("recover"):
+                recovered = self.__ocrRecovery.recover(sudokuPuzzle, *puzzleFinder.getTopDigits())
+            if recovered is not None:
+                sudokuPuzzle, result["corrections"] = recovered
+                self.__sudokuSolver.setGrid(sudokuPuzzle)
+                self.__sudokuSolver.solveSudoku()
+                result["status"] = "solved"
+                result["solution"] = formatPuzzle(sudokuPuzzle)
+        timings["solve_ms"] = (time.perf_counter() - tick) * 1000
+
+        return self.__finish(result, start)
+
+    def __findGrid(self, puzzleFinder):
+        if self.__contourMode == "largest-quad":
+            return puzzleFinder.setLargestQuadrilateral()
+
+        # same choice as the first page of the upload window
+        contours = puzzleFinder.getGridContours()
+        if contours is None:
+            return False
+        return puzzleFinder.setContour(max(contours, key=cv2.contourArea))
+
+    @staticmethod
+    def __finish(result, start):
+        result["timings"]["total_ms"] = (time.perf_counter() - start) * 1000
+        return result
+
+
+def findImages(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        paths.extend(path for path in glob.glob(pattern) if path.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(set(paths))
+
+
+class ResultWriter:
+    __file = None
+    __csvWriter = None
+
+    def __init__(self, file, fileFormat):
+        self.__file = file
+        if fileFormat == "csv":
+            self.__csvWriter = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+            self.__csvWriter.writeheader()
+
+    def write(self, result):
+        if self.__csvWriter is None:
+            self.__file.write(json.dumps(result) + "\n")
+        else:
+            row = {key: result[key] for key in ("image", "status", "givens", "solution")}
+            row["corrections"] = json.dumps(result["corrections"]) if result["corrections"] else None
+            row.update({key: "%.3f" % value for key, value in result["timings"].items()})
+            self.__csvWriter.writerow(row)
+        self.__file.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Sudoku puzzle images without the GUI.")
+    parser.add_argument("images", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("--output", default=None, help="output file (defaults to stdout)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None, help="defaults to the output file extension, else jsonl")
+    parser.add_argument("--contour", choices=("largest-quad", "largest"), default="largest-quad",
+                        help="'largest-quad' picks the largest plausible quadrilateral, 'largest' the largest contour")
+    parser.add_argument("--engine", choices=SudokuSolver.ENGINES, default="bitmask")
+    parser.add_argument("--model", default="model/digitReader.npz", help="exported .npz weights, an int8 .tflite model or a Keras .h5 model")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes, 0 uses every core")
+    parser.add_argument("--queue-size", type=int, default=None, help="maximum images in flight (defaults to 2 per worker)")
+    parser.add_argument("--recovery-budget", type=float, default=200,
+                        help="milliseconds spent retrying misread digits of an invalid or unsolvable puzzle, 0 disables it")
+    parser.add_argument("--profile", default=None, help="write per-stage latency percentiles to this file ('-' for stderr)")
+    parser.add_argument("--profile-format", choices=("json", "prometheus"), default="json")
+    args = parser.parse_args()
+    # headless runs keep every sample instead of a rolling window
+    profiler = StageProfiler(window=None, enabled=args.profile is not None)
+
+    paths = findImages(args.images)
+    if not paths:
+        raise SystemExit("No .png, .jpg or .jpeg images matched.")
+
+    fileFormat = args.format
+    if fileFormat is None:
+        fileFormat = "csv" if args.output and args.output.endswith(".csv") else "jsonl"
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = ResultWriter(output, fileFormat)
+        if args.workers == 1:
+            batchSolver = BatchSolver(loadDigitClassifier(args.model), args.engine, args.contour, profiler,
+                                      args.recovery_budget / 1000)
+            for path in paths:
+                writer.write(batchSolver.solveImage(path))
+        else:
+            # stages run in the workers, so only the coarse timings of each result are profiled
+            from ParallelSolver import ParallelSolver
+            with ParallelSolver(args.model, args.workers or None, args.engine, args.contour, args.queue_size,
+                                recoveryBudget=args.recovery_budget / 1000) as parallelSolver:
+                for result in parallelSolver.map(paths):
+                    for key, value in result["timings"].items():
+                        profiler.record(key[:-len("_ms")], value / 1000)
+                    writer.write(result)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.profile:
+        report = profiler.toJson() + "\n" if args.profile_format == "json" else profiler.toPrometheus()
+        if args.profile == "-":
+            sys.stderr.write(report)
+        else:
+            with open(args.profile, "w") as file:
+                file.write(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# Each worker process builds its own BatchSolver once, so the model is loaded once per worker
+workerSolver = None
+
+
+def initWorker(modelPath, engine, contourMode, threadsPerWorker, recoveryBudget):
+    global workerSolver
+
+    # imported here rather than at the top, BatchSolver imports ParallelSolver for its CLI
+    import cv2
+    from BatchSolver import BatchSolver
+    from DigitClassifier import loadDigitClassifier
+
+    # keep every worker on its own core instead of competing for all of them
+    cv2.setNumThreads(threadsPerWorker)
+    if not modelPath.endswith(".npz"):
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threadsPerWorker)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    workerSolver = BatchSolver(loadDigitClassifier(modelPath), engine, contourMode, recoveryBudget=recoveryBudget)
+
+
+def solveInWorker(path):
+    return workerSolver.solveImage(path)
@@ -0,0 +1,88 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from DigitClassifier import loadDigitClassifier
+from PuzzleFinder import PuzzleFinder
+
+SAMPLE_PUZZLE = (
+    "300801002"
+    "201030604"
+    "000204000"
+    "809000106"
+    "080000050"
+    "702000400"
+    "000509000"
+    "904080705"
+    "800107003"
+)
+
+
+def renderPuzzleImage(puzzle, cellSize=50, margin=60):
+    # Draw a clean printed puzzle on a white page
+    gridSize = cellSize * 9
+    image = np.full((gridSize + 2 * margin, gridSize + 2 * margin, 3), 255, dtype="uint8")
+    for i in range(10):
+        thickness = 4 if i % 3 == 0 else 1
+        offset = margin + i * cellSize
+        cv2.line(image, (margin, offset), (margin + gridSize, offset), (0, 0, 0), thickness)
+        cv2.line(image, (offset, margin), (offset, margin + gridSize), (0, 0, 0), thickness)
+
+    for r in range(9):
+        for c in range(9):
+            digit = int(puzzle[r * 9 + c])
+            if digit != 0:
+                x = margin + c * cellSize + cellSize // 4
+                y = margin + (r + 1) * cellSize - cellSize // 4
+                cv2.putText(image, str(digit), (x, y), cv2.FONT_HERSHEY_SIMPLEX, cellSize / 35, (0, 0, 0), 3)
+
+    return image
+
+
+def timeAnalyzeSquares(puzzleFinder, batched, repeats, segmentationMode="grid"):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        puzzleFinder.analyzeSquares(batched, segmentationMode)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-cell and batched digit inference latency.")
+    parser.add_argument("--model", default="model/digitReader.h5")
+    parser.add_argument("--image", default=None, help="puzzle image to use instead of a rendered sample")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--segmentation", choices=("grid", "cell"), default="grid")
+    args = parser.parse_args()
+
+    digitReader = loadDigitClassifier(args.model)
+
+    image = cv2.imread(args.image) if args.image else renderPuzzleImage(SAMPLE_PUZZLE)
+    puzzleFinder = PuzzleFinder(image, digitReader)
+    contours = puzzleFinder.getGridContours()
+    if contours is None or not puzzleFinder.setContour(max(contours, key=cv2.contourArea)):
+        raise SystemExit("Grid was not found in the image.")
+    puzzleFinder.extractGridFromCorners()
+
+    # Both paths must agree before their timings are worth comparing
+    perCellPuzzle, _, perCellConfidences = puzzleFinder.classifySquares(False, args.segmentation)
+    batchedPuzzle, _, batchedConfidences = puzzleFinder.classifySquares(True, args.segmentation)
+    numDigits = int(np.count_nonzero(perCellConfidences))
+    print("Digits classified:", numDigits)
+    print("Predictions match:", bool(np.array_equal(perCellPuzzle, batchedPuzzle)))
+    print("Max confidence difference: %.2e" % np.abs(perCellConfidences - batchedConfidences).max())
+
+    for batched in (False, True):
+        timeAnalyzeSquares(puzzleFinder, batched, args.warmup, args.segmentation)
+
+    perCell = timeAnalyzeSquares(puzzleFinder, False, args.repeats, args.segmentation)
+    batched = timeAnalyzeSquares(puzzleFinder, True, args.repeats, args.segmentation)
+    for name, timings in (("per-cell", perCell), ("batched", batched)):
+        print("%-8s  mean %8.2f ms  p50 %8.2f ms  min %8.2f ms" % (name, timings.mean(), np.median(timings), timings.min()))
+    print("Speedup (p50): %.1fx" % (np.median(perCell) / np.median(batched)))
+
+
+if __name__ == "__main__":
+    main()
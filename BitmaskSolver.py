@@ -0,0 +1,186 @@
+import numpy as np
+
+ALL_CANDIDATES = 0x3FE
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 10)]
+
+# Every cell belongs to one row (0-8), one column (9-17) and one 3x3 box (18-26)
+CELL_UNITS = [(i // 9, 9 + i % 9, 18 + (i // 27) * 3 + (i % 9) // 3) for i in range(81)]
+UNITS = [[i for i in range(81) if u in CELL_UNITS[i]] for u in range(27)]
+
+
+class BitmaskSolver:
+    __cells = None
+    __unitMasks = None
+    __nodes = 0
+    __backtracks = 0
+    __solutions = 0
+    __limit = 1
+    __firstSolution = None
+
+    def solve(self, grid):
+        if not self.__run(grid, 1):
+            return False
+
+        grid[:, :] = np.reshape(self.__cells, (9, 9))
+        return True
+
+    def countSolutions(self, grid, limit=2, solution=None):
+        # the search stops as soon as limit solutions are found, None counts all of them;
+        # the first solution found is copied into solution when one is given
+        self.__run(grid, limit or 0)
+        if solution is not None and self.__firstSolution is not None:
+            solution[:, :] = np.reshape(self.__firstSolution, (9, 9))
+        return self.__solutions
+
+    def __run(self, grid, limit):
+        self.__nodes = 0
+        self.__backtracks = 0
+        self.__solutions = 0
+        self.__limit = limit
+        self.__firstSolution = None
+        if not self.__load(grid):
+            return False
+        return self.__search()
+
+    def getNodes(self):
+        return self.__nodes
+
+    def getBacktracks(self):
+        return self.__backtracks
+
+    def __load(self, grid):
+        self.__cells = [int(v) for v in np.asarray(grid).flatten()]
+        self.__unitMasks = [0] * 27
+        masks = self.__unitMasks
+
+        for i, value in enumerate(self.__cells):
+            if value != 0:
+                bit = 1 << value
+                r, c, b = CELL_UNITS[i]
+                # givens that already break a constraint can never be solved
+                if (masks[r] | masks[c] | masks[b]) & bit:
+                    return False
+                masks[r] |= bit
+                masks[c] |= bit
+                masks[b] |= bit
+
+        return True
+
+    def __place(self, i, bit):
+        masks = self.__unitMasks
+        r, c, b = CELL_UNITS[i]
+        self.__cells[i] = bit.bit_length() - 1
+        masks[r] |= bit
+        masks[c] |= bit
+        masks[b] |= bit
+
+    def __remove(self, i):
+        masks = self.__unitMasks
+        r, c, b = CELL_UNITS[i]
+        bit = ~(1 << self.__cells[i])
+        self.__cells[i] = 0
+        masks[r] &= bit
+        masks[c] &= bit
+        masks[b] &= bit
+
+    def __undo(self, trail):
+        for i in reversed(trail):
+            self.__remove(i)
+
+    def __search(self):
+        cells = self.__cells
+        masks = self.__unitMasks
+        trail = []
+
+        if not self.__propagate(trail):
+            self.__undo(trail)
+            return False
+
+        # choose the most constrained blank cell (MRV)
+        best, bestCount, bestCandidates = -1, 10, 0
+        for i in range(81):
+            if cells[i] == 0:
+                r, c, b = CELL_UNITS[i]
+                candidates = ALL_CANDIDATES & ~(masks[r] | masks[c] | masks[b])
+                count = POPCOUNT[candidates]
+                if count < bestCount:
+                    best, bestCount, bestCandidates = i, count, candidates
+                    if count == 2:
+                        break
+
+        # puzzle is complete, keep searching until enough solutions were counted
+        if best == -1:
+            self.__solutions += 1
+            if self.__firstSolution is None:
+                self.__firstSolution = list(cells)
+            if self.__solutions == self.__limit:
+                return True
+            self.__undo(trail)
+            return False
+
+        while bestCandidates:
+            bit = bestCandidates & -bestCandidates
+            bestCandidates ^= bit
+            self.__nodes += 1
+            self.__place(best, bit)
+            if self.__search():
+                return True
+            self.__remove(best)
+            self.__backtracks += 1
+
+        self.__undo(trail)
+        return False
+
+    def __propagate(self, trail):
+        cells = self.__cells
+        masks = self.__unitMasks
+        changed = True
+
+        while changed:
+            changed = False
+
+            # naked singles: a blank cell with only one candidate left
+            for i in range(81):
+                if cells[i] == 0:
+                    r, c, b = CELL_UNITS[i]
+                    candidates = ALL_CANDIDATES & ~(masks[r] | masks[c] | masks[b])
+                    if candidates == 0:
+                        return False
+                    if candidates & (candidates - 1) == 0:
+                        self.__place(i, candidates)
+                        trail.append(i)
+                        changed = True
+
+            if changed:
+                continue
+
+            # hidden singles: a digit that fits in only one cell of a unit
+            for u, unit in enumerate(UNITS):
+                seenOnce, seenTwice = 0, 0
+                for i in unit:
+                    if cells[i] == 0:
+                        r, c, b = CELL_UNITS[i]
+                        candidates = ALL_CANDIDATES & ~(masks[r] | masks[c] | masks[b])
+                        seenTwice |= seenOnce & candidates
+                        seenOnce |= candidates
+
+                if (seenOnce | masks[u]) != ALL_CANDIDATES:
+                    return False
+
+                hidden = seenOnce & ~seenTwice
+                if hidden == 0:
+                    continue
+
+                for i in unit:
+                    if cells[i] == 0:
+                        r, c, b = CELL_UNITS[i]
+                        bit = hidden & ~(masks[r] | masks[c] | masks[b])
+                        if bit == 0:
+                            continue
+                        if bit & (bit - 1):
+                            return False
+                        self.__place(i, bit)
+                        trail.append(i)
+                        changed = True
+
+        return True
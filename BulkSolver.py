@@ -0,0 +1,119 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from BitmaskSolver import ALL_CANDIDATES, BitmaskSolver, CELL_UNITS, UNITS
+from PuzzleCorpus import formatPuzzles, readPuzzleChunks
+
+UNIT_CELLS = np.array(UNITS)
+CELL_UNIT_INDEX = np.array(CELL_UNITS)
+DIGIT_BITS = (1 << np.arange(1, 10)).astype("uint16")
+POPCOUNT_TABLE = np.array([bin(mask).count("1") for mask in range(1 << 10)], dtype="uint8")
+
+# digit of every candidate mask with exactly one bit set, 0 for every other mask
+SINGLE_DIGIT = np.zeros(1 << 10, dtype="uint8")
+SINGLE_DIGIT[DIGIT_BITS] = np.arange(1, 10)
+
+
+class BulkSolver:
+    # Propagates singles over many puzzles at once, only puzzles that still have blanks are searched one by one
+    __bitmaskSolver = None
+    __stats = None
+
+    def __init__(self):
+        self.__bitmaskSolver = BitmaskSolver()
+        self.__stats = {"puzzles": 0, "solved_by_propagation": 0, "searched": 0, "unsolved": 0}
+
+    def getStats(self):
+        return dict(self.__stats)
+
+    def solveArray(self, grids):
+        # (N, 9, 9) givens -> (N, 9, 9) solutions and whether each puzzle was solved, unsolved puzzles keep their givens
+        grids = np.asarray(grids)
+        cells = grids.reshape((-1, 81)).astype("uint8")
+        consistent = self.propagate(cells)
+        complete = consistent & (cells != 0).all(axis=1)
+        solved = complete.copy()
+
+        for i in np.nonzero(consistent & ~complete)[0]:
+            solved[i] = self.__bitmaskSolver.solve(cells[i].reshape((9, 9)))
+
+        cells[~solved] = grids.reshape((-1, 81))[~solved]
+        self.__stats["puzzles"] += len(cells)
+        self.__stats["solved_by_propagation"] += int(complete.sum())
+        self.__stats["searched"] += int((consistent & ~complete).sum())
+        self.__stats["unsolved"] += int((~solved).sum())
+        return cells.reshape((-1, 9, 9)), solved
+
+    def solveFile(self, inputPath, output, chunkSize=10000):
+        # one "givens,solution" line per puzzle, the solution is empty when there is none
+        for chunk in readPuzzleChunks(inputPath, chunkSize):
+            solutions, solved = self.solveArray(chunk)
+            output.writelines("%s,%s\n" % (givens, solution if isSolved else "")
+                              for givens, solution, isSolved in zip(formatPuzzles(chunk), formatPuzzles(solutions), solved))
+
+    @staticmethod
+    def propagate(cells):
+        # Fills naked and hidden singles of (N, 81) puzzles in place and returns which puzzles are still consistent
+        consistent = np.ones(len(cells), dtype=bool)
+        active = np.arange(len(cells))
+
+        while len(active):
+            grid = cells[active]
+            blank = grid == 0
+
+            # digits placed in every unit, a digit counted twice breaks the puzzle
+            bits = np.where(blank, 0, np.left_shift(1, grid, dtype="uint16"))
+            unitBits = bits[:, UNIT_CELLS]
+            unitMasks = np.bitwise_or.reduce(unitBits, axis=2)
+            ok = (POPCOUNT_TABLE[unitMasks] == (unitBits != 0).sum(axis=2)).all(axis=1)
+
+            # candidates of blank cells, a blank cell without any breaks the puzzle
+            used = np.bitwise_or.reduce(unitMasks[:, CELL_UNIT_INDEX], axis=2)
+            candidates = np.where(blank, ALL_CANDIDATES & ~used, 0).astype("uint16")
+            ok &= ~(blank & (candidates == 0)).any(axis=1)
+
+            # how many cells of each unit can still take each digit, a missing digit with no cell breaks the puzzle
+            unitPlanes = (candidates[:, UNIT_CELLS, None] & DIGIT_BITS) != 0
+            counts = unitPlanes.sum(axis=2)
+            placed = (unitMasks[:, :, None] & DIGIT_BITS) != 0
+            ok &= ~((counts == 0) & ~placed).any(axis=(1, 2))
+
+            # naked singles, then hidden singles, clashing placements are caught on the next pass
+            filled = np.where(blank, SINGLE_DIGIT[candidates], grid)
+            puzzle, unit, digit = np.nonzero(counts == 1)
+            position = unitPlanes[puzzle, unit, :, digit].argmax(axis=1)
+            filled[puzzle, UNIT_CELLS[unit, position]] = digit + 1
+
+            cells[active] = filled
+            consistent[active[~ok]] = False
+            active = active[ok & (filled != grid).any(axis=1)]
+
+        return consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a file of 81-character puzzles in vectorized chunks.")
+    parser.add_argument("input", help="one puzzle per line (0 or . for blanks, # comments) or a binary corpus")
+    parser.add_argument("--output", default=None, help="'givens,solution' lines (defaults to stdout)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="puzzles held in memory at once")
+    args = parser.parse_args()
+
+    bulkSolver = BulkSolver()
+    start = time.perf_counter()
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        bulkSolver.solveFile(args.input, output, args.chunk_size)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    stats = bulkSolver.getStats()
+    stats["seconds"] = time.perf_counter() - start
+    stats["puzzles_per_second"] = stats["puzzles"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import time
+from array import array
+import numpy as np
+
+# Exact cover matrix: 729 candidates (cell, digit) against 324 constraints, each candidate satisfies four of them
+COLUMNS = 324
+CANDIDATES = 729
+ROOT = 0
+FIRST_NODE = COLUMNS + 1
+
+
+def candidateColumns(candidate):
+    # cell filled, digit in row, digit in column and digit in 3x3 box, numbered from 1 since 0 is the root
+    cell, digit = divmod(candidate, 9)
+    row, col = divmod(cell, 9)
+    box = (row // 3) * 3 + col // 3
+    return 1 + cell, 82 + row * 9 + digit, 163 + col * 9 + digit, 244 + box * 9 + digit
+
+
+class DancingLinksSolver:
+    # Algorithm X with dancing links, the matrix is built once and every search leaves it as it found it.
+    # A search running past timeBudget seconds gives up, solve and countSolutions then return None
+    __left = None
+    __right = None
+    __up = None
+    __down = None
+    __column = None
+    __size = None
+    __candidate = None
+    __covered = None
+    __partial = None
+    __solution = None
+    __nodes = 0
+    __backtracks = 0
+    __solutions = 0
+    __limit = 1
+    __timeBudget = None
+    __deadline = None
+    __expired = False
+
+    def __init__(self, timeBudget=None):
+        self.__timeBudget = timeBudget
+        count = FIRST_NODE + 4 * CANDIDATES
+        self.__left = array("i", [0]) * count
+        self.__right = array("i", [0]) * count
+        self.__up = array("i", range(count))
+        self.__down = array("i", range(count))
+        self.__column = array("i", [0]) * count
+        self.__size = array("i", [0]) * FIRST_NODE
+        self.__candidate = array("i", [0]) * count
+        self.__covered = bytearray(FIRST_NODE)
+        self.__partial = []
+
+        # circular header list: root, then the 324 constraint columns
+        for h in range(FIRST_NODE):
+            self.__left[h] = h - 1 if h > 0 else COLUMNS
+            self.__right[h] = h + 1 if h < COLUMNS else ROOT
+
+        # four linked nodes per candidate, each appended to the bottom of its column
+        for candidate in range(CANDIDATES):
+            first = FIRST_NODE + 4 * candidate
+            for k, c in enumerate(candidateColumns(candidate)):
+                node = first + k
+                self.__left[node] = first + (k - 1) % 4
+                self.__right[node] = first + (k + 1) % 4
+                self.__column[node] = c
+                self.__candidate[node] = candidate
+                self.__up[node] = self.__up[c]
+                self.__down[node] = c
+                self.__down[self.__up[c]] = node
+                self.__up[c] = node
+                self.__size[c] += 1
+
+    def solve(self, grid):
+        solved = self.__run(grid, 1)
+        if not solved:
+            return solved
+        self.__writeSolution(grid, grid)
+        return True
+
+    def countSolutions(self, grid, limit=2, solution=None):
+        # the search stops as soon as limit solutions are found, None counts all of them;
+        # the first solution found is copied into solution when one is given
+        if self.__run(grid, limit or 0) is None:
+            return None
+        if solution is not None and self.__solution is not None:
+            self.__writeSolution(grid, solution)
+        return self.__solutions
+
+    def hasExpired(self):
+        return self.__expired
+
+    def getNodes(self):
+        return self.__nodes
+
+    def getBacktracks(self):
+        return self.__backtracks
+
+    def __run(self, grid, limit):
+        self.__nodes = 0
+        self.__backtracks = 0
+        self.__solutions = 0
+        self.__limit = limit
+        self.__solution = None
+        self.__expired = False
+        self.__deadline = None if self.__timeBudget is None else time.perf_counter() + self.__timeBudget
+
+        givens = self.__selectGivens(grid)
+        if givens is None:
+            return False
+        try:
+            done = self.__search()
+        finally:
+            self.__releaseGivens(givens)
+        return None if self.__expired else done
+
+    def __writeSolution(self, grid, target):
+        cells = np.array(grid).reshape(-1)
+        for candidate in self.__solution:
+            cells[candidate // 9] = candidate % 9 + 1
+        target[:, :] = cells.reshape((9, 9))
+
+    def __selectGivens(self, grid):
+        givens = []
+        for cell, value in enumerate(np.asarray(grid).reshape(-1).tolist()):
+            if value == 0:
+                continue
+            first = FIRST_NODE + 4 * (cell * 9 + value - 1)
+
+            # a constraint already satisfied by another given means the givens clash
+            if any(self.__covered[self.__column[first + k]] for k in range(4)):
+                self.__releaseGivens(givens)
+                return None
+            for k in range(4):
+                self.__cover(self.__column[first + k])
+                self.__covered[self.__column[first + k]] = 1
+            givens.append(first)
+        return givens
+
+    def __releaseGivens(self, givens):
+        for first in reversed(givens):
+            for k in range(3, -1, -1):
+                self.__uncover(self.__column[first + k])
+                self.__covered[self.__column[first + k]] = 0
+
+    def __search(self):
+        right = self.__right
+        down = self.__down
+        column = self.__column
+
+        if right[ROOT] == ROOT:
+            self.__solutions += 1
+            if self.__solution is None:
+                self.__solution = list(self.__partial)
+            return self.__solutions == self.__limit
+
+        # running out of time ends the search like a found solution, so every level still uncovers its columns
+        if self.__deadline is not None and time.perf_counter() > self.__deadline:
+            self.__expired = True
+            return True
+
+        # the constraint with the fewest candidates left
+        size = self.__size
+        best, bestSize = ROOT, CANDIDATES + 1
+        c = right[ROOT]
+        while c != ROOT:
+            if size[c] < bestSize:
+                best, bestSize = c, size[c]
+                if bestSize <= 1:
+                    break
+            c = right[c]
+        if bestSize == 0:
+            return False
+
+        cover, uncover = self.__cover, self.__uncover
+        cover(best)
+        r = down[best]
+        while r != best:
+            self.__nodes += 1
+            self.__partial.append(self.__candidate[r])
+            # the other three constraints of the candidate, unrolled since every row has four nodes
+            j1 = right[r]
+            j2 = right[j1]
+            j3 = right[j2]
+            cover(column[j1])
+            cover(column[j2])
+            cover(column[j3])
+
+            done = self.__search()
+
+            uncover(column[j3])
+            uncover(column[j2])
+            uncover(column[j1])
+            self.__partial.pop()
+            if done:
+                uncover(best)
+                return True
+            self.__backtracks += 1
+            r = down[r]
+
+        uncover(best)
+        return False
+
+    def __cover(self, c):
+        left, right, up, down = self.__left, self.__right, self.__up, self.__down
+        column, size = self.__column, self.__size
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def __uncover(self, c):
+        left, right, up, down = self.__left, self.__right, self.__up, self.__down
+        column, size = self.__column, self.__size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
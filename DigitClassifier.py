@@ -0,0 +1,178 @@
+import argparse
+import json
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def loadDigitClassifier(path):
+    # Any object with predict(samples) -> (N, 10) probabilities can be used by PuzzleFinder
+    if path.endswith(".npz"):
+        return NumpyDigitClassifier(path)
+    if path.endswith(".tflite"):
+        return TFLiteDigitClassifier(path)
+
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+
+class NumpyDigitClassifier:
+    # Runs the exported digitReader layers with NumPy only
+    __layers = None
+    __weights = None
+
+    def __init__(self, path):
+        with np.load(path) as archive:
+            self.__layers = json.loads(str(archive["layers"]))
+            self.__weights = [(archive["kernel%d" % i], archive["bias%d" % i]) if "kernel%d" % i in archive else None
+                              for i in range(len(self.__layers))]
+
+    def predict(self, samples):
+        x = np.asarray(samples, dtype="float32")
+        for layer, weights in zip(self.__layers, self.__weights):
+            kind = layer["type"]
+            if kind == "Conv2D":
+                x = self.__activate(self.__conv2d(x, weights, layer["padding"]), layer["activation"])
+            elif kind == "Dense":
+                x = self.__activate(x @ weights[0] + weights[1], layer["activation"])
+            elif kind == "MaxPooling2D":
+                x = self.__maxPool(x, layer["pool_size"])
+            elif kind == "Flatten":
+                x = x.reshape((len(x), -1))
+            elif kind == "Activation":
+                x = self.__activate(x, layer["activation"])
+        return x
+
+    @staticmethod
+    def __conv2d(x, weights, padding):
+        kernel, bias = weights
+        kh, kw = kernel.shape[:2]
+        if padding == "same":
+            # TensorFlow puts the smaller half of the padding before, which matters for even kernels
+            x = np.pad(x, ((0, 0), ((kh - 1) // 2, kh // 2), ((kw - 1) // 2, kw // 2), (0, 0)))
+
+        # (N, H, W, C, kh, kw) windows contracted with the (kh, kw, C, F) kernel
+        windows = sliding_window_view(x, (kh, kw), axis=(1, 2))
+        return np.tensordot(windows, kernel, axes=([3, 4, 5], [2, 0, 1])) + bias
+
+    @staticmethod
+    def __maxPool(x, poolSize):
+        ph, pw = poolSize
+        n, h, w, c = x.shape
+        x = x[:, :h // ph * ph, :w // pw * pw]
+        return x.reshape((n, h // ph, ph, w // pw, pw, c)).max(axis=(2, 4))
+
+    @staticmethod
+    def __activate(x, activation):
+        if activation == "relu":
+            return np.maximum(x, 0)
+        if activation == "softmax":
+            e = np.exp(x - x.max(axis=-1, keepdims=True))
+            return e / e.sum(axis=-1, keepdims=True)
+        if activation == "linear":
+            return x
+        raise ValueError("Unsupported activation '%s'." % activation)
+
+
+class TFLiteDigitClassifier:
+    # Runs a TensorFlow Lite model, quantizing inputs and dequantizing outputs for int8 models
+    __interpreter = None
+    __input = None
+    __output = None
+    __batchSize = None
+
+    def __init__(self, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.__interpreter = Interpreter(model_path=path)
+        self.__input = self.__interpreter.get_input_details()[0]
+        self.__output = self.__interpreter.get_output_details()[0]
+
+    def predict(self, samples):
+        samples = np.asarray(samples, dtype="float32")
+        if self.__batchSize != len(samples):
+            self.__interpreter.resize_tensor_input(self.__input["index"], samples.shape)
+            self.__interpreter.allocate_tensors()
+            self.__batchSize = len(samples)
+
+        scale, zeroPoint = self.__input["quantization"]
+        if scale:
+            info = np.iinfo(self.__input["dtype"])
+            samples = np.clip(np.round(samples / scale + zeroPoint), info.min, info.max)
+        self.__interpreter.set_tensor(self.__input["index"], samples.astype(self.__input["dtype"]))
+        self.__interpreter.invoke()
+
+        output = self.__interpreter.get_tensor(self.__output["index"])
+        scale, zeroPoint = self.__output["quantization"]
+        if scale:
+            output = (output.astype("float32") - zeroPoint) * scale
+        return output
+
+
+def exportWeights(modelPath, outputPath):
+    from tensorflow.keras.models import load_model
+    model = load_model(modelPath)
+
+    layers = []
+    arrays = {}
+    for i, layer in enumerate(model.layers):
+        config = layer.get_config()
+        kind = type(layer).__name__
+        if kind == "Dropout":
+            kind = "Identity"
+        elif kind not in ("Conv2D", "Dense", "MaxPooling2D", "Flatten", "Activation"):
+            raise ValueError("Layer %s of type %s cannot be exported." % (layer.name, kind))
+
+        spec = {"type": kind}
+        for key in ("padding", "activation", "pool_size"):
+            if key in config:
+                spec[key] = config[key]
+        if kind == "Conv2D" and (tuple(config["strides"]) != (1, 1) or tuple(config["dilation_rate"]) != (1, 1)):
+            raise ValueError("Only unit strides and dilation are supported.")
+        if kind == "MaxPooling2D" and tuple(config["strides"] or config["pool_size"]) != tuple(config["pool_size"]):
+            raise ValueError("Only non-overlapping pooling is supported.")
+        layers.append(spec)
+
+        if kind in ("Conv2D", "Dense"):
+            kernel, bias = layer.get_weights()
+            arrays["kernel%d" % i] = kernel.astype("float32")
+            arrays["bias%d" % i] = bias.astype("float32")
+
+    np.savez(outputPath, layers=json.dumps(layers), **arrays)
+
+
+def checkParity(modelPath, exportedPath, numSamples=2000):
+    from tensorflow.keras.datasets import mnist
+    from tensorflow.keras.models import load_model
+
+    (_, _), (x_test, _) = mnist.load_data()
+    samples = np.expand_dims(x_test[:numSamples].astype("float32") / 255, -1)
+
+    expected = load_model(modelPath).predict(samples, verbose=0)
+    actual = NumpyDigitClassifier(exportedPath).predict(samples)
+    return {
+        "samples": len(samples),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "argmax_agreement": float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export digitReader for the NumPy runtime and check its parity.")
+    parser.add_argument("--model", default="model/digitReader.h5")
+    parser.add_argument("--output", default="model/digitReader.npz")
+    parser.add_argument("--samples", type=int, default=2000, help="MNIST test images used for the parity check")
+    args = parser.parse_args()
+
+    exportWeights(args.model, args.output)
+    report = checkParity(args.model, args.output, args.samples)
+    print(json.dumps(report, indent=2))
+    if report["argmax_agreement"] < 1.0 or report["max_abs_diff"] > 1e-4:
+        raise SystemExit("Exported model does not match %s." % args.model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+
+
+class LatestQueue:
+    # Holds at most one item, a newer item replaces one that was never taken
+    __condition = None
+    __item = None
+    __hasItem = False
+    __closed = False
+    __dropped = 0
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+
+    def put(self, item):
+        with self.__condition:
+            if self.__hasItem:
+                self.__dropped += 1
+            self.__item = item
+            self.__hasItem = True
+            self.__condition.notify()
+
+    def get(self, timeout=None):
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__hasItem or self.__closed, timeout)
+            return self.getNowait()
+
+    def getNowait(self):
+        with self.__condition:
+            item = self.__item
+            self.__item = None
+            self.__hasItem = False
+            return item
+
+    def getDropped(self):
+        return self.__dropped
+
+    def close(self):
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+
+class FpsCounter:
+    __ticks = None
+
+    def __init__(self, window=30):
+        self.__ticks = deque(maxlen=window)
+
+    def tick(self):
+        self.__ticks.append(time.perf_counter())
+
+    def getFps(self):
+        if len(self.__ticks) < 2:
+            return 0.0
+        elapsed = self.__ticks[-1] - self.__ticks[0]
+        return (len(self.__ticks) - 1) / elapsed if elapsed > 0 else 0.0
+
+
+class FramePipeline:
+    # capture -> recognition stages run on their own threads, display pulls from the caller's thread
+    __videoCapture = None
+    __recognize = None
+    __displayQueue = None
+    __recognitionQueue = None
+    __resultQueue = None
+    __threads = None
+    __running = False
+    __failed = False
+    __captureFps = None
+    __recognitionFps = None
+    __displayFps = None
+
+    def __init__(self, videoCapture, recognize):
+        self.__videoCapture = videoCapture
+        self.__recognize = recognize
+        self.__displayQueue = LatestQueue()
+        self.__recognitionQueue = LatestQueue()
+        self.__resultQueue = LatestQueue()
+        self.__captureFps = FpsCounter()
+        self.__recognitionFps = FpsCounter()
+        self.__displayFps = FpsCounter()
+
+    def start(self):
+        self.__running = True
+        self.__threads = [
+            threading.Thread(target=self.__captureLoop, name="capture", daemon=True),
+            threading.Thread(target=self.__recognitionLoop, name="recognition", daemon=True),
+        ]
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self):
+        self.__running = False
+        self.__displayQueue.close()
+        self.__recognitionQueue.close()
+        for thread in self.__threads or []:
+            thread.join()
+        self.__threads = None
+
+    def hasFailed(self):
+        return self.__failed
+
+    def getFrame(self):
+        frame = self.__displayQueue.getNowait()
+        if frame is not None:
+            self.__displayFps.tick()
+        return frame
+
+    def getResult(self):
+        return self.__resultQueue.getNowait()
+
+    def getFps(self):
+        return {
+            "capture": self.__captureFps.getFps(),
+            "recognition": self.__recognitionFps.getFps(),
+            "display": self.__displayFps.getFps(),
+        }
+
+    def __captureLoop(self):
+        while self.__running:
+            success, frame = self.__videoCapture.read()
+            if not success:
+                self.__failed = True
+                break
+            self.__captureFps.tick()
+            self.__displayQueue.put(frame)
+            self.__recognitionQueue.put(frame)
+        self.__recognitionQueue.close()
+
+    def __recognitionLoop(self):
+        while self.__running:
+            frame = self.__recognitionQueue.get(timeout=0.5)
+            if frame is None:
+                if self.__failed:
+                    break
+                continue
+            self.__resultQueue.put(self.__recognize(frame))
+            self.__recognitionFps.tick()
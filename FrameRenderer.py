@@ -0,0 +1,43 @@
+import numpy as np
+from LazyImport import lazyImport
+
+cv2 = lazyImport("cv2")
+Image = lazyImport("PIL.Image")
+ImageTk = lazyImport("PIL.ImageTk")
+
+
+class FrameRenderer:
+    # Shows frames through one RGBA buffer and one PhotoImage that are only reallocated when the frame size changes
+    __label = None
+    __buffer = None
+    __bufferImage = None
+    __photoImage = None
+
+    def __init__(self, label):
+        self.__label = label
+
+    def render(self, frame, draw=None):
+        # draw(buffer) can add overlays, colors are in RGBA order
+        height, width = frame.shape[:2]
+        if self.__buffer is None or self.__buffer.shape[:2] != (height, width):
+            self.__allocate(width, height)
+
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.__buffer)
+        if draw is not None:
+            draw(self.__buffer)
+
+        # the PIL image shares the buffer's memory, so pasting is the only copy into Tk
+        self.__photoImage.paste(self.__bufferImage)
+
+    def __allocate(self, width, height):
+        self.__buffer = np.empty((height, width, 4), dtype="uint8")
+        self.__bufferImage = Image.frombuffer("RGBA", (width, height), self.__buffer, "raw", "RGBA", 0, 1)
+        self.__photoImage = ImageTk.PhotoImage("RGBA", (width, height))
+        self.__label.configure(image=self.__photoImage)
+        self.__label.imgtk = self.__photoImage
+
+    @staticmethod
+    def toBufferColor(color):
+        # OpenCV BGR color to an opaque RGBA buffer color
+        blue, green, red = color
+        return red, green, blue, 255
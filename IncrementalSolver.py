@@ -0,0 +1,121 @@
+import numpy as np
+from BitmaskSolver import ALL_CANDIDATES, BitmaskSolver, CELL_UNITS, UNITS
+
+
+class IncrementalSolver:
+    # Puzzle state for interactive edits, digit counts per unit let one edit update conflicts and candidates locally
+    __cells = None
+    __unitCounts = None
+    __unitMasks = None
+    __conflicts = None
+    __bitmaskSolver = None
+    __solution = None
+    __solutionValid = False
+    __edits = 0
+    __solves = 0
+
+    def __init__(self, grid=None):
+        self.__bitmaskSolver = BitmaskSolver()
+        self.load(np.zeros((9, 9), dtype=int) if grid is None else grid)
+
+    def load(self, grid):
+        self.__cells = [0] * 81
+        self.__unitCounts = [[0] * 10 for _ in range(27)]
+        self.__unitMasks = [0] * 27
+        self.__conflicts = set()
+        self.__solution = None
+        self.__solutionValid = False
+        for i, value in enumerate(np.asarray(grid).flatten().tolist()):
+            if value != 0:
+                self.__place(i, int(value))
+        self.__conflicts = {i for i in range(81) if self.__isConflicting(i)}
+
+    def setCell(self, row, col, value):
+        # returns the (row, col) cells whose conflict state changed
+        i = row * 9 + col
+        old = self.__cells[i]
+        if value == old:
+            return set()
+        if not 0 <= value <= 9:
+            raise ValueError("Cell value must be between 0 and 9, got %d." % value)
+
+        self.__edits += 1
+        if old != 0:
+            self.__remove(i, old)
+        if value != 0:
+            self.__place(i, value)
+        self.__updateSolution(i, old, value)
+
+        # only cells sharing a unit with the edit and holding the old or new digit can change state
+        changed = set()
+        for u in CELL_UNITS[i]:
+            for j in UNITS[u]:
+                if self.__cells[j] in (old, value) and (j in self.__conflicts) != self.__isConflicting(j):
+                    self.__conflicts ^= {j}
+                    changed.add(divmod(j, 9))
+        return changed
+
+    def clearCell(self, row, col):
+        return self.setCell(row, col, 0)
+
+    def getCell(self, row, col):
+        return self.__cells[row * 9 + col]
+
+    def getGrid(self):
+        return np.reshape(self.__cells, (9, 9))
+
+    def getCandidates(self, row, col):
+        i = row * 9 + col
+        if self.__cells[i] != 0:
+            return []
+        r, c, b = CELL_UNITS[i]
+        mask = ALL_CANDIDATES & ~(self.__unitMasks[r] | self.__unitMasks[c] | self.__unitMasks[b])
+        return [digit for digit in range(1, 10) if mask & (1 << digit)]
+
+    def getConflicts(self):
+        return {divmod(i, 9) for i in self.__conflicts}
+
+    def hasConflict(self, row, col):
+        return row * 9 + col in self.__conflicts
+
+    def getSolution(self):
+        # (9, 9) solution of the current cells or None, solved again only when an edit broke the last answer
+        if not self.__solutionValid:
+            self.__solution = None
+            if not self.__conflicts:
+                self.__solves += 1
+                grid = self.getGrid()
+                if self.__bitmaskSolver.solve(grid):
+                    self.__solution = grid
+            self.__solutionValid = True
+        return self.__solution
+
+    def getStats(self):
+        return {"edits": self.__edits, "solves": self.__solves}
+
+    def __updateSolution(self, i, old, value):
+        # a solution stays a solution when a cell is cleared or set to its own digit,
+        # and a puzzle without one stays unsolvable when more digits are added
+        if not self.__solutionValid:
+            return None
+        if self.__solution is None:
+            self.__solutionValid = value != 0 and old == 0
+        else:
+            self.__solutionValid = value == 0 or self.__solution.flat[i] == value
+
+    def __place(self, i, value):
+        self.__cells[i] = value
+        for u in CELL_UNITS[i]:
+            self.__unitCounts[u][value] += 1
+            self.__unitMasks[u] |= 1 << value
+
+    def __remove(self, i, value):
+        self.__cells[i] = 0
+        for u in CELL_UNITS[i]:
+            self.__unitCounts[u][value] -= 1
+            if self.__unitCounts[u][value] == 0:
+                self.__unitMasks[u] &= ~(1 << value)
+
+    def __isConflicting(self, i):
+        value = self.__cells[i]
+        return value != 0 and any(self.__unitCounts[u][value] > 1 for u in CELL_UNITS[i])
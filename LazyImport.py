@@ -0,0 +1,19 @@
+import importlib
+import types
+from Profiler import startupProfiler
+
+
+class LazyModule(types.ModuleType):
+    # Stands in for a module until one of its attributes is first used
+    def __getattr__(self, attr):
+        name = self.__name__
+        with startupProfiler.measure("import " + name):
+            module = importlib.import_module(name)
+
+        # later lookups hit the copied attributes directly
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazyImport(name):
+    return LazyModule(name)
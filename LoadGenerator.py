@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import time
+from BenchmarkSolver import summarize
+from PuzzleCorpus import formatPuzzle, readPuzzles
+
+
+async def request(reader, writer, method, path, body, host):
+    head = "%s %s HTTP/1.1\r\nHost: %s\r\nContent-Length: %d\r\n\r\n" % (method, path, host, len(body))
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, path, bodies, counter, total, latencies, statuses):
+    # one keep-alive connection sending requests back to back
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] < total:
+            body = bodies[counter[0] % len(bodies)]
+            counter[0] += 1
+            start = time.perf_counter()
+            status, payload = await request(reader, writer, "POST", path, body, host)
+            latencies.append(time.perf_counter() - start)
+            key = str(status) if status != 200 else payload.get("status")
+            statuses[key] = statuses.get(key, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, path, bodies, total, concurrency):
+    counter, latencies, statuses = [0], [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, path, bodies, counter, total, latencies, statuses)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await request(reader, writer, "GET", "/stats", b"", host)
+    writer.close()
+
+    return {
+        "path": path,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "latency": summarize(latencies),
+        "statuses": statuses,
+        "server": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure SolveService latency and throughput under concurrent load.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--images", nargs="*", default=None, help="image files sent to /solve/image")
+    parser.add_argument("--puzzles", default="puzzles/hard.txt", help="puzzle file sent to /solve/grid when no images are given")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.images:
+        path = "/solve/image"
+        bodies = []
+        for image in args.images:
+            with open(image, "rb") as file:
+                bodies.append(file.read())
+    else:
+        path = "/solve/grid"
+        bodies = [formatPuzzle(grid).encode("ascii") for grid in readPuzzles(args.puzzles)]
+
+    report = asyncio.run(run(args.host, args.port, path, bodies, args.requests, args.concurrency))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import heapq
+import time
+import numpy as np
+from SudokuSolver import SudokuSolver
+
+
+class OcrRecovery:
+    # Searches the digit reader's runner-up digits for a valid puzzle with exactly one solution
+    __sudokuSolver = None
+    __timeBudget = None
+    __maxCells = None
+    __maxChanges = None
+    __candidates = 0
+
+    def __init__(self, timeBudget=0.05, maxCells=8, maxChanges=3, engine="bitmask"):
+        self.__sudokuSolver = SudokuSolver(engine=engine)
+        self.__timeBudget = timeBudget
+        self.__maxCells = maxCells
+        self.__maxChanges = maxChanges
+
+    def getStats(self):
+        return {"candidates": self.__candidates}
+
+    def recover(self, puzzle, digits, probabilities):
+        # Returns the corrected puzzle and its [row, col, digit] corrections, or None when the budget runs out
+        deadline = time.perf_counter() + self.__timeBudget
+        self.__candidates = 0
+        alternatives = self.__getAlternatives(puzzle, digits, probabilities)
+
+        # cheapest sets of corrections first, at most one correction per square
+        heap = [(alternatives[0][0], (0,))] if alternatives else []
+        while heap and time.perf_counter() < deadline:
+            cost, chosen = heapq.heappop(heap)
+            last = chosen[-1]
+            if last + 1 < len(alternatives):
+                if len(chosen) < self.__maxChanges:
+                    heapq.heappush(heap, (cost + alternatives[last + 1][0], chosen + (last + 1,)))
+                heapq.heappush(heap, (cost - alternatives[last][0] + alternatives[last + 1][0], chosen[:-1] + (last + 1,)))
+
+            corrections = [alternatives[i][1:] for i in chosen]
+            if len({(row, col) for row, col, _ in corrections}) < len(corrections):
+                continue
+
+            candidate = puzzle.copy()
+            for row, col, digit in corrections:
+                candidate[row, col] = digit
+            self.__candidates += 1
+            if not SudokuSolver.isValidPuzzle(candidate):
+                continue
+
+            self.__sudokuSolver.setGrid(candidate)
+            if self.__sudokuSolver.countSolutions(2) == 1:
+                return candidate, [list(correction) for correction in corrections]
+
+        return None
+
+    def __getAlternatives(self, puzzle, digits, probabilities):
+        # runner-up digits of the least confident squares, cost is the log-probability lost by the swap
+        read = np.argwhere(probabilities[:, :, 0] > 0)
+        read = read[np.argsort(probabilities[read[:, 0], read[:, 1], 0], kind="stable")][:self.__maxCells]
+
+        alternatives = []
+        for row, col in read:
+            best = np.log(probabilities[row, col, 0])
+            for digit, probability in zip(digits[row, col, 1:], probabilities[row, col, 1:]):
+                if probability > 0 and digit != puzzle[row, col]:
+                    alternatives.append((best - np.log(probability), int(row), int(col), int(digit)))
+
+        alternatives.sort()
+        return alternatives
@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from BatchWorker import initWorker, solveInWorker
+
+BLAS_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+@contextmanager
+def workerEnvironment(threadsPerWorker):
+    # BLAS pools are sized when a worker first imports NumPy, before its initializer runs, so the limit has to be in
+    # the environment the worker is started with; variables the user already set are kept
+    added = [variable for variable in BLAS_THREAD_VARIABLES if variable not in os.environ]
+    for variable in added:
+        os.environ[variable] = str(threadsPerWorker)
+    try:
+        yield
+    finally:
+        for variable in added:
+            os.environ.pop(variable, None)
+
+
+class ParallelSolver:
+    __executor = None
+    __maxPending = None
+    __threadsPerWorker = 1
+
+    def __init__(self, modelPath="model/digitReader.npz", workers=None, engine="bitmask", contourMode="largest-quad",
+                 queueSize=None, threadsPerWorker=1, recoveryBudget=0.2):
+        workers = workers or os.cpu_count() or 1
+        self.__maxPending = queueSize or 2 * workers
+        self.__threadsPerWorker = threadsPerWorker
+
+        # spawn instead of fork, TensorFlow is not fork-safe
+        self.__executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initWorker,
+            initargs=(modelPath, engine, contourMode, threadsPerWorker, recoveryBudget),
+        )
+
+    def map(self, paths):
+        # at most maxPending images are queued, results are yielded in input order
+        pending = deque()
+        for path in paths:
+            if len(pending) >= self.__maxPending:
+                yield pending.popleft().result()
+            # spawned workers are started inside submit, the parent's environment is restored right after
+            with workerEnvironment(self.__threadsPerWorker):
+                pending.append(self.__executor.submit(solveInWorker, path))
+
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+
+HERSHEY_FONTS = (
+    cv2.FONT_HERSHEY_SIMPLEX,
+    cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_COMPLEX,
+    cv2.FONT_HERSHEY_TRIPLEX,
+    cv2.FONT_HERSHEY_PLAIN,
+)
+
+
+def renderPrintedDigits(count, fonts=None, seed=0):
+    # Printed digits cropped like PuzzleFinder squares: white on black, 50x50 resized to 28x28
+    rng = np.random.default_rng(seed)
+    fonts = list(fonts) if fonts else list(HERSHEY_FONTS)
+    trueTypeFonts = {}
+    images = np.zeros((count, 28, 28), dtype="uint8")
+    labels = rng.integers(0, 10, count).astype("uint8")
+
+    for i in range(count):
+        font = fonts[rng.integers(len(fonts))]
+        canvas = np.zeros((50, 50), dtype="uint8")
+        height = int(rng.integers(26, 38))
+        if isinstance(font, str):
+            from PIL import Image, ImageDraw, ImageFont
+            if (font, height) not in trueTypeFonts:
+                trueTypeFonts[(font, height)] = ImageFont.truetype(font, height)
+            image = Image.fromarray(canvas)
+            ImageDraw.Draw(image).text((25, 25), str(labels[i]), fill=255, font=trueTypeFonts[(font, height)], anchor="mm")
+            canvas = np.asarray(image).copy()
+        else:
+            scale = cv2.getFontScaleFromHeight(font, height, 2)
+            (width, textHeight), _ = cv2.getTextSize(str(labels[i]), font, scale, 2)
+            origin = ((50 - width) // 2, (50 + textHeight) // 2)
+            cv2.putText(canvas, str(labels[i]), origin, font, scale, 255, int(rng.integers(2, 5)))
+
+        # small shifts and rotations, like a slightly misaligned warp
+        angle = rng.uniform(-6, 6)
+        shift = rng.uniform(-3, 3, 2)
+        transformation = cv2.getRotationMatrix2D((25, 25), angle, 1.0)
+        transformation[:, 2] += shift
+        canvas = cv2.warpAffine(canvas, transformation, (50, 50))
+        images[i] = cv2.resize(canvas, (28, 28))
+
+    return images, labels
@@ -0,0 +1,140 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+
+class StartupProfiler:
+    # Records how long each import and initialization step takes until the main window is ready
+    __start = None
+    __readyAt = None
+    __phases = None
+    __enabled = False
+
+    def __init__(self):
+        self.__start = time.perf_counter()
+        self.__phases = []
+
+    def enable(self):
+        self.__enabled = True
+
+    def isEnabled(self):
+        return self.__enabled
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.__phases.append({
+                "name": name,
+                "start_ms": (start - self.__start) * 1000,
+                "duration_ms": (end - start) * 1000,
+                "deferred": self.__readyAt is not None,
+            })
+
+    def ready(self):
+        if self.__readyAt is None:
+            self.__readyAt = time.perf_counter()
+            if self.__enabled:
+                print(self.formatReport(), file=sys.stderr)
+
+    def getReport(self):
+        return {
+            "ready_ms": (self.__readyAt - self.__start) * 1000 if self.__readyAt is not None else None,
+            "phases": [phase for phase in self.__phases if not phase["deferred"]],
+            "deferred": [phase for phase in self.__phases if phase["deferred"]],
+        }
+
+    def formatReport(self):
+        report = self.getReport()
+        lines = ["Startup report"]
+        for phase in report["phases"]:
+            lines.append("  %-32s %9.1f ms" % (phase["name"], phase["duration_ms"]))
+        if report["ready_ms"] is not None:
+            lines.append("  %-32s %9.1f ms" % ("window ready after", report["ready_ms"]))
+        for phase in report["deferred"]:
+            lines.append("  %-32s %9.1f ms (on first use)" % (phase["name"], phase["duration_ms"]))
+        return "\n".join(lines)
+
+
+startupProfiler = StartupProfiler()
+
+
+class StageProfiler:
+    # Rolling latency samples of every pipeline stage, a disabled profiler costs one call per stage
+    __window = None
+    __samples = None
+    __totals = None
+    __lock = None
+    __enabled = True
+    __disabledStage = nullcontext()
+
+    def __init__(self, window=300, enabled=True):
+        self.__window = window
+        self.__samples = {}
+        self.__totals = {}
+        self.__lock = threading.Lock()
+        self.__enabled = enabled
+
+    def isEnabled(self):
+        return self.__enabled
+
+    def stage(self, name):
+        return self.__measure(name) if self.__enabled else self.__disabledStage
+
+    @contextmanager
+    def __measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.__lock:
+            if name not in self.__samples:
+                self.__samples[name] = deque(maxlen=self.__window)
+                self.__totals[name] = [0, 0.0]
+            self.__samples[name].append(seconds * 1000)
+
+            # every sample ever recorded, the percentiles only cover the rolling window
+            self.__totals[name][0] += 1
+            self.__totals[name][1] += seconds * 1000
+
+    def getStats(self):
+        with self.__lock:
+            samples = {name: np.array(values) for name, values in self.__samples.items()}
+            totals = {name: tuple(total) for name, total in self.__totals.items()}
+
+        return {name: {
+            "count": int(len(values)),
+            "total_count": totals[name][0],
+            "total_ms": totals[name][1],
+            "last_ms": float(values[-1]),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "max_ms": float(values.max()),
+        } for name, values in samples.items() if len(values)}
+
+    def formatLines(self):
+        return ["%-10s p50 %6.1f  p95 %6.1f  max %6.1f ms" % (name, stats["p50_ms"], stats["p95_ms"], stats["max_ms"])
+                for name, stats in self.getStats().items()]
+
+    def toJson(self):
+        return json.dumps(self.getStats(), indent=2)
+
+    def toPrometheus(self, metric="sudoku_stage_latency_ms"):
+        lines = ["# HELP %s Rolling latency of each recognition pipeline stage." % metric, "# TYPE %s summary" % metric]
+        for name, stats in self.getStats().items():
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("1", "max_ms")):
+                lines.append('%s{stage="%s",quantile="%s"} %.4f' % (metric, name, quantile, stats[key]))
+            lines.append('%s_sum{stage="%s"} %.4f' % (metric, name, stats["total_ms"]))
+            lines.append('%s_count{stage="%s"} %d' % (metric, name, stats["total_count"]))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,225 @@
+import argparse
+import numpy as np
+
+# Binary corpus: a 16 byte header followed by fixed-size records, so puzzle i starts at HEADER_SIZE + i * record size
+CORPUS_MAGIC = b"SDKC"
+CORPUS_VERSION = 1
+HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u1"), ("cellBits", "<u1"), ("reserved", "<u2"), ("count", "<u8")])
+HEADER_SIZE = HEADER_DTYPE.itemsize
+UNPACKED_RECORD_SIZE = 81
+PACKED_RECORD_SIZE = 41
+
+
+def parsePuzzle(line):
+    line = line.strip()
+    if len(line) != 81:
+        raise ValueError("Puzzle line must have 81 characters, got %d." % len(line))
+
+    grid = np.zeros((9, 9)).astype(int)
+    for i, ch in enumerate(line):
+        if ch in ".0":
+            continue
+        if not "1" <= ch <= "9":
+            raise ValueError("Invalid puzzle character '%s' at position %d." % (ch, i))
+        grid[i // 9, i % 9] = int(ch)
+
+    return grid
+
+
+def formatPuzzle(grid, blank="0"):
+    return "".join(str(int(v)) if v != 0 else blank for v in np.asarray(grid).flatten())
+
+
+def readPuzzles(path):
+    # one puzzle per line, blank lines and '#' comments are ignored
+    if isBinaryCorpus(path):
+        corpus = BinaryCorpus(path)
+        for i in range(len(corpus)):
+            yield corpus.getGrid(i).astype(int)
+        return None
+
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield parsePuzzle(line)
+
+
+def parsePuzzles(lines):
+    # (N, 9, 9) uint8 grids from many 81-character lines at once
+    lines = [line.strip() for line in lines]
+    for i, line in enumerate(lines):
+        if len(line) != 81:
+            raise ValueError("Puzzle line %d must have 81 characters, got %d." % (i, len(line)))
+
+    cells = np.frombuffer("".join(lines).encode("ascii"), dtype="uint8").reshape((-1, 9, 9)).copy()
+    cells[cells == ord(".")] = ord("0")
+    if ((cells < ord("0")) | (cells > ord("9"))).any():
+        raise ValueError("Puzzle lines may only contain digits and '.'.")
+    return cells - ord("0")
+
+
+def formatPuzzles(grids, blank="0"):
+    characters = np.asarray(grids, dtype="uint8").reshape((-1, 81)) + ord("0")
+    if blank != "0":
+        characters[characters == ord("0")] = ord(blank)
+    return [line.decode("ascii") for line in np.ascontiguousarray(characters).view("S81").ravel()]
+
+
+def readPuzzleChunks(path, chunkSize=10000):
+    # same lines as readPuzzles, yielded as (N, 9, 9) arrays of at most chunkSize puzzles
+    if isBinaryCorpus(path):
+        yield from BinaryCorpus(path).iterChunks(chunkSize)
+        return None
+
+    with open(path) as file:
+        chunk = []
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                chunk.append(line)
+                if len(chunk) == chunkSize:
+                    yield parsePuzzles(chunk)
+                    chunk = []
+        if chunk:
+            yield parsePuzzles(chunk)
+
+
+def packCells(cells):
+    # (N, 81) cells to (N, 41) bytes, two cells per byte with the first one in the high nibble
+    padded = np.zeros((len(cells), 82), dtype="uint8")
+    padded[:, :81] = cells
+    return (padded[:, 0::2] << 4) | padded[:, 1::2]
+
+
+def unpackCells(records):
+    cells = np.empty((len(records), 82), dtype="uint8")
+    cells[:, 0::2] = records >> 4
+    cells[:, 1::2] = records & 0x0F
+    return cells[:, :81]
+
+
+def isBinaryCorpus(path):
+    with open(path, "rb") as file:
+        return file.read(len(CORPUS_MAGIC)) == CORPUS_MAGIC
+
+
+class BinaryCorpus:
+    # Memory-mapped reader, unpacked corpora hand out read-only (9, 9) views of the file without copying
+    __path = None
+    __records = None
+    __count = 0
+    __packed = False
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) != 1 or header["magic"][0] != CORPUS_MAGIC:
+            raise ValueError("'%s' is not a binary puzzle corpus." % path)
+        if header["version"][0] != CORPUS_VERSION:
+            raise ValueError("Unsupported corpus version %d." % header["version"][0])
+        if header["cellBits"][0] not in (4, 8):
+            raise ValueError("Unsupported cell size of %d bits." % header["cellBits"][0])
+
+        self.__path = path
+        self.__count = int(header["count"][0])
+        self.__packed = header["cellBits"][0] == 4
+        recordSize = PACKED_RECORD_SIZE if self.__packed else UNPACKED_RECORD_SIZE
+        if self.__count == 0:
+            self.__records = np.zeros((0, recordSize), dtype="uint8")
+        else:
+            self.__records = np.memmap(path, dtype="uint8", mode="r", offset=HEADER_SIZE,
+                                       shape=(self.__count, recordSize))
+
+    def __len__(self):
+        return self.__count
+
+    def isPacked(self):
+        return self.__packed
+
+    def getGrid(self, index):
+        return self.getGrids(index, index + 1)[0]
+
+    def getGrids(self, start, stop):
+        # (N, 9, 9) uint8, a view of the file unless the cells are packed; copy before solving in place
+        records = self.__records[start:stop]
+        if self.__packed:
+            return unpackCells(records).reshape((-1, 9, 9))
+        return records.reshape((-1, 9, 9))
+
+    def iterChunks(self, chunkSize=10000):
+        for start in range(0, self.__count, chunkSize):
+            yield self.getGrids(start, start + chunkSize)
+
+
+class BinaryCorpusWriter:
+    # Appends puzzles to a binary corpus, the header's count is filled in on close
+    __file = None
+    __packed = False
+    __count = 0
+
+    def __init__(self, path, packed=False):
+        self.__file = open(path, "wb")
+        self.__packed = packed
+        self.__writeHeader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def write(self, grids):
+        # one (9, 9) grid or an (N, 9, 9) array of them
+        cells = np.asarray(grids).reshape((-1, 81))
+        if ((cells < 0) | (cells > 9)).any():
+            raise ValueError("Cells must hold digits from 0 to 9.")
+        cells = cells.astype("uint8")
+        self.__file.write((packCells(cells) if self.__packed else cells).tobytes())
+        self.__count += len(cells)
+
+    def close(self):
+        if self.__file is None:
+            return None
+        self.__file.seek(0)
+        self.__writeHeader()
+        self.__file.close()
+        self.__file = None
+
+    def __writeHeader(self):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = CORPUS_MAGIC
+        header["version"] = CORPUS_VERSION
+        header["cellBits"] = 4 if self.__packed else 8
+        header["count"] = self.__count
+        self.__file.write(header.tobytes())
+
+
+def textToBinary(textPath, binaryPath, packed=False, chunkSize=10000):
+    with BinaryCorpusWriter(binaryPath, packed) as writer:
+        for chunk in readPuzzleChunks(textPath, chunkSize):
+            writer.write(chunk)
+
+
+def binaryToText(binaryPath, textPath, blank="0", chunkSize=10000):
+    with open(textPath, "w") as file:
+        for chunk in BinaryCorpus(binaryPath).iterChunks(chunkSize):
+            file.writelines(line + "\n" for line in formatPuzzles(chunk, blank))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert puzzle files between the 81-character text format and the binary corpus format.")
+    parser.add_argument("input", help="a text puzzle file is converted to binary, a binary corpus back to text")
+    parser.add_argument("output")
+    parser.add_argument("--packed", action="store_true", help="store two cells per byte (41 bytes instead of 81 per puzzle)")
+    parser.add_argument("--blank", default="0", help="blank character of the text output")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="puzzles held in memory at once")
+    args = parser.parse_args()
+
+    if isBinaryCorpus(args.input):
+        binaryToText(args.input, args.output, args.blank, args.chunk_size)
+    else:
+        textToBinary(args.input, args.output, args.packed, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,167 @@
-import cv2
-import imutils
 import numpy as np
 from math import dist
-from keras_preprocessing.image import img_to_array
-from skimage.segmentation import clear_border
+from LazyImport import lazyImport
+from Profiler import StageProfiler
+
+cv2 = lazyImport("cv2")
+imutils = lazyImport("imutils")
+segmentation = lazyImport("skimage.segmentation")
+
+# Histogram bin offset of every pixel of the 450x450 puzzle image, 256 bins per square
+SQUARE_BINS = ((np.arange(450) // 50)[:, None] * 9 + (np.arange(450) // 50)[None, :]) * 256
+
+# Grid tracking gives up below this many followed points and re-detects the grid every so many frames to undo drift
+MIN_TRACKED_POINTS = 12
+REDETECT_INTERVAL = 30
+TRACKING_MARGIN = 24
+
+# Contours are searched on a pyramid level at most this wide, outlines this much smaller or larger than the hold
+# still range (in squared shorter frame sides) still get a prompt
+DETECTION_WIDTH = 640
+OUTLINE_MARGIN = 0.22
 
 
 class PuzzleFinder:
     __image = None
+    __levelImage = None
     __cannyImage = None
+    __detectionScale = 1.0
+    __detectionWidth = None
     __gridCorners = None
     __puzzleImage = None
     __digitReader = None
-
-    def __init__(self, img, digitReader):
+    __overlay = None
+    __profiler = None
+    __probabilities = None
+    __trackedLevel = None
+    __trackedPoints = None
+    __trackedCorners = None
+    __trackedFrames = 0
+
+    def __init__(self, img, digitReader, profiler=None, detectionWidth=DETECTION_WIDTH):
+        self.__profiler = profiler if profiler is not None else StageProfiler(enabled=False)
+        self.__detectionWidth = detectionWidth
         self.updateImage(img)
         self.__digitReader = digitReader
 
     def updateImage(self, image):
+        # edges are only computed once a contour search needs them
         self.__image = image
-        self.__preprocessImage()
+        self.__levelImage = None
+        self.__cannyImage = None
+
+    def __getLevelImage(self):
+        # grayscale pyramid level no wider than detectionWidth, points found on it are scaled back up
+        if self.__levelImage is None:
+            level = cv2.cvtColor(self.__image, cv2.COLOR_BGR2GRAY)
+            while self.__detectionWidth and level.shape[1] > self.__detectionWidth:
+                level = cv2.pyrDown(level)
+            self.__detectionScale = level.shape[1] / self.__image.shape[1]
+            self.__levelImage = level
+        return self.__levelImage
+
+    def __getCannyImage(self):
+        if self.__cannyImage is None:
+            with self.__profiler.stage("preprocess"):
+                imgBlurred = cv2.GaussianBlur(self.__getLevelImage(), (5, 5), 3)
+                self.__cannyImage = cv2.Canny(imgBlurred, 50, 50)
+        return self.__cannyImage
+
+    def __toFullResolution(self, points):
+        return np.round(points / self.__detectionScale).astype(np.int32)
+
+    def getDisplayThickness(self, displayHeight=540, thickness=3):
+        # Line thickness that stays the same once the image is resized to displayHeight
+        return max(1, int(round(thickness * self.__image.shape[0] / displayHeight)))
+
+    def getGridCornersWeb(self, minAreaFraction=0.87, maxAreaFraction=0.95, draw=True, track=False):
+        # Areas are fractions of the squared shorter frame side, so the same grid size works at any resolution
+        # With track set, a grid found in earlier frames is followed with optical flow until it is lost
+        if track and self.__trackGrid(minAreaFraction, maxAreaFraction, draw):
+            return True
+
+        with self.__profiler.stage("detect"):
+            found = self.__findGridCornersWeb(minAreaFraction, maxAreaFraction, draw)
+        if track:
+            self.__startTracking(found)
+        return found
+
+    def isTracking(self):
+        return self.__trackedPoints is not None
+
+    def __startTracking(self, found):
+        self.__trackedFrames = 0
+        if not found:
+            self.__trackedPoints = None
+            return None
+
+        # follow the grid line intersections inside the detected outline
+        level = self.__getLevelImage()
+        corners = self.__gridCorners.astype(np.float32) * self.__detectionScale
+        mask = np.zeros(level.shape, dtype="uint8")
+        cv2.fillConvexPoly(mask, np.round(corners).astype(np.int32), 255)
+        points = cv2.goodFeaturesToTrack(level, maxCorners=64, qualityLevel=0.01, minDistance=7, mask=mask)
+        if points is None or len(points) < MIN_TRACKED_POINTS:
+            self.__trackedPoints = None
+            return None
+
+        self.__trackedLevel = level
+        self.__trackedPoints = points
+        self.__trackedCorners = corners
+
+    def __trackGrid(self, minAreaFraction, maxAreaFraction, draw):
+        if self.__trackedPoints is None or self.__trackedFrames >= REDETECT_INTERVAL:
+            return False
 
-    def __preprocessImage(self):
-        imgGray = cv2.cvtColor(self.__image, cv2.COLOR_BGR2GRAY)
-        imgBlurred = cv2.GaussianBlur(imgGray, (5, 5), 3)
-        self.__cannyImage = cv2.Canny(imgBlurred, 50, 50)
+        with self.__profiler.stage("track"):
+            # optical flow only looks at the grid's surroundings on the detection pyramid level
+            level = self.__getLevelImage()
+            height, width = level.shape
+            x0, y0 = np.maximum(self.__trackedCorners.min(axis=0).astype(int) - TRACKING_MARGIN, 0)
+            x1, y1 = self.__trackedCorners.max(axis=0).astype(int) + TRACKING_MARGIN
+            offset = np.float32([x0, y0])
+            points, status, _ = cv2.calcOpticalFlowPyrLK(self.__trackedLevel[y0:y1, x0:x1], level[y0:y1, x0:x1],
+                                                         self.__trackedPoints - offset, None, winSize=(15, 15), maxLevel=2)
+            points += offset
+            found = (status.ravel() == 1) & (points[:, 0, 0] >= 0) & (points[:, 0, 0] < width) \
+                & (points[:, 0, 1] >= 0) & (points[:, 0, 1] < height)
+            if found.sum() < MIN_TRACKED_POINTS:
+                self.__trackedPoints = None
+                return False
+
+            # the grid is flat, so one homography moves every point and the four corners
+            homography, inliers = cv2.findHomography(self.__trackedPoints[found], points[found], cv2.RANSAC, 2.0)
+            if homography is None or inliers.sum() < MIN_TRACKED_POINTS:
+                self.__trackedPoints = None
+                return False
+
+            corners = cv2.perspectiveTransform(self.__trackedCorners.reshape((4, 1, 2)), homography)
+            area = cv2.contourArea(corners)
+            side = min(height, width)
+            if not minAreaFraction * side * side <= area <= maxAreaFraction * side * side \
+                    or not cv2.isContourConvex(np.round(corners).astype(np.int32)):
+                self.__trackedPoints = None
+                return False
+
+            self.__trackedLevel = level
+            self.__trackedPoints = points[found][inliers.ravel() == 1]
+            self.__trackedCorners = corners.reshape((4, 2))
+            self.__trackedFrames += 1
+
+        approx = self.__toFullResolution(corners)
+        self.__gridCorners = approx.reshape((4, 2))
+        self.__overlay = [(approx, "Hold Still")]
+        if draw:
+            self.drawOverlay(self.__image, self.__overlay)
+        return True
 
-    def getGridCornersWeb(self, minArea=200000, maxArea=220000):
-        contours, hierarchy = cv2.findContours(self.__cannyImage, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
-        minOutline, maxOutline = minArea-50000, maxArea+50000
-        height, width, _ = self.__image.shape
+    def __findGridCornersWeb(self, minAreaFraction, maxAreaFraction, draw):
+        cannyImage = self.__getCannyImage()
+        contours, hierarchy = cv2.findContours(cannyImage, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        side = min(cannyImage.shape)
+        minArea, maxArea = minAreaFraction * side * side, maxAreaFraction * side * side
+        minOutline, maxOutline = minArea - OUTLINE_MARGIN * side * side, maxArea + OUTLINE_MARGIN * side * side
+        self.__overlay = []
 
         # find grid contour
         for cnt in contours:
@@ -37,34 +169,85 @@ class PuzzleFinder:
             if minOutline <= area <= maxOutline:
                 # Find coordinates of contour corners
                 perimeter = cv2.arcLength(cnt, True)
-                approx = cv2.approxPolyDP(cnt, 0.05 * perimeter, True)
-
-                # Drawing skewed rectangle and corners
-                cv2.drawContours(self.__image, [approx], -1, (0, 255, 0), 4)
-                for point in approx:
-                    x, y = point[0]
-                    cv2.circle(self.__image, (x, y), 4, (0, 0, 255), 8)
+                approx = self.__toFullResolution(cv2.approxPolyDP(cnt, 0.05 * perimeter, True))
 
                 # Sudoku grid has been detected
                 if minArea <= area <= maxArea:
-                    cv2.putText(self.__image, "Hold Still", (int(width * 0.45), int(height * 0.95)), cv2.FONT_HERSHEY_DUPLEX, 1, (0, 0, 0), 16)
-                    cv2.putText(self.__image, "Hold Still", (int(width * 0.45), int(height * 0.95)), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 255, 255), 2)
-                    self.__gridCorners = approx.reshape((4, 2))
-                    return True
+                    prompt = "Hold Still"
                 else:
                     prompt = "Bring Closer" if area < minArea else "Move Further"
-                    cv2.putText(self.__image, prompt, (int(width * 0.42), int(height * 0.95)), cv2.FONT_HERSHEY_DUPLEX, 1, (0, 0, 0), 16)
-                    cv2.putText(self.__image, prompt, (int(width * 0.42), int(height * 0.95)), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 255, 255), 2)
+
+                # Drawing skewed rectangle, corners and prompt
+                self.__overlay.append((approx, prompt))
+                if draw:
+                    self.drawOverlay(self.__image, [(approx, prompt)])
+
+                if prompt == "Hold Still":
+                    self.__gridCorners = approx.reshape((4, 2))
+                    return True
 
         self.__gridCorners = None
         return False
 
+    def getGridCorners(self):
+        return self.__gridCorners
+
+    def getPuzzleImage(self):
+        return self.__puzzleImage
+
+    def getOverlay(self):
+        return self.__overlay
+
+    @staticmethod
+    def drawOverlay(image, overlay, rgba=False):
+        # RGBA images, like the FrameRenderer buffer, take opaque colors in RGBA order
+        if rgba:
+            green, red, black, white = (0, 255, 0, 255), (255, 0, 0, 255), (0, 0, 0, 255), (255, 255, 255, 255)
+        else:
+            green, red, black, white = (0, 255, 0), (0, 0, 255), (0, 0, 0), (255, 255, 255)
+
+        height, width = image.shape[:2]
+        for approx, prompt in overlay:
+            cv2.drawContours(image, [approx], -1, green, 4)
+            for point in approx:
+                x, y = point[0]
+                cv2.circle(image, (int(x), int(y)), 4, red, 8)
+
+            position = (int(width * (0.45 if prompt == "Hold Still" else 0.42)), int(height * 0.95))
+            cv2.putText(image, prompt, position, cv2.FONT_HERSHEY_DUPLEX, 1, black, 16)
+            cv2.putText(image, prompt, position, cv2.FONT_HERSHEY_DUPLEX, 1, white, 2)
+
     def getGridContours(self):
-        contours, hierarchy = cv2.findContours(self.__cannyImage, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        contours = self.__findContours()
+        if contours is None:
+            return None
+        return [self.__toFullResolution(cnt) for cnt in contours]
+
+    def __findContours(self):
+        contours, hierarchy = cv2.findContours(self.__getCannyImage(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
         if len(contours) == 0:
             return None
         return contours
 
+    def setLargestQuadrilateral(self, minAreaFraction=0.05):
+        contours = self.__findContours()
+        if contours is None:
+            return False
+
+        # the grid is the biggest convex four-sided outline covering enough of the image
+        height, width = self.__cannyImage.shape
+        minArea = minAreaFraction * height * width
+        for cnt in sorted(contours, key=cv2.contourArea, reverse=True):
+            if cv2.contourArea(cnt) < minArea:
+                break
+            perimeter = cv2.arcLength(cnt, True)
+            approx = cv2.approxPolyDP(cnt, 0.05 * perimeter, True)
+            if len(approx) == 4 and cv2.isContourConvex(approx):
+                self.__gridCorners = self.__toFullResolution(approx).reshape((4, 2))
+                return True
+
+        return False
+
     def setContour(self, cnt):
         perimeter = cv2.arcLength(cnt, True)
         approx = cv2.approxPolyDP(cnt, 0.05 * perimeter, True)
@@ -75,6 +258,10 @@ class PuzzleFinder:
         return True
 
     def extractGridFromCorners(self):
+        with self.__profiler.stage("warp"):
+            self.__warpGrid()
+
+    def __warpGrid(self):
         # Classify each point as top/bottom and left/right
         sortedCoordinates = self.__gridCorners[self.__gridCorners[:, 0].argsort()]
         leftSide = sortedCoordinates[:2]
@@ -105,36 +292,134 @@ class PuzzleFinder:
         threshGrid = cv2.threshold(grayscaleGrid, 127, 255, cv2.THRESH_BINARY)[1]
         self.__puzzleImage = cv2.resize(threshGrid, (450, 450), interpolation=cv2.INTER_AREA)
 
-    def analyzeSquares(self):
+    def analyzeSquares(self, batched=True, segmentationMode="grid"):
+        puzzle, newCoordinates, _ = self.classifySquares(batched, segmentationMode)
+        return puzzle, newCoordinates
+
+    def classifySquares(self, batched=True, segmentationMode="grid"):
         puzzle = np.zeros((9, 9)).astype(int)
+        confidences = np.zeros((9, 9))
+        self.__probabilities = np.zeros((9, 9, 10))
         newCoordinates = set()
 
+        # Determine which squares contain a digit
+        with self.__profiler.stage("segment"):
+            if segmentationMode == "grid":
+                coordinates, samples = self.__extractSquaresGrid(newCoordinates)
+            else:
+                coordinates, samples = self.__extractSquares(newCoordinates)
+        if len(samples) == 0:
+            return puzzle, newCoordinates, confidences
+
+        # Predict every digit in a single forward pass, or one square at a time
+        with self.__profiler.stage("predict"):
+            if batched:
+                probabilities = self.__digitReader.predict(np.stack(samples))
+            else:
+                probabilities = np.concatenate([self.__digitReader.predict(np.expand_dims(sample, axis=0)) for sample in samples])
+
+        for (row, col), probability in zip(coordinates, probabilities):
+            prediction = int(probability.argmax())
+            puzzle[row, col] = prediction
+            confidences[row, col] = probability[prediction]
+            self.__probabilities[row, col] = probability
+
+        return puzzle, newCoordinates, confidences
+
+    def getTopDigits(self, k=3):
+        # The k most likely digits of every square read by the last analyzeSquares call, best first
+        order = np.argsort(-self.__probabilities, axis=2, kind="stable")[:, :, :k]
+        return order, np.take_along_axis(self.__probabilities, order, axis=2)
+
+    def __extractSquares(self, newCoordinates):
+        coordinates = []
+        samples = []
+
         for y in range(0, 401, 50):
             for x in range(0, 401, 50):
                 square = self.__puzzleImage[y:y + 50, x:x + 50]
 
                 # Determine if digit contains a digit or not
                 digit = self.__extractDigit(square)
-                prediction = 0
 
-                # If digit exists, predict it
+                # If digit exists, prepare it for the digit reader
                 if digit is not None:
                     squareSample = cv2.resize(digit, (28, 28))
-                    squareSample = squareSample.astype("float") / 255.0
-                    squareSample = img_to_array(squareSample)
-                    squareSample = np.expand_dims(squareSample, axis=0)
-                    prediction = int(self.__digitReader.predict(squareSample).argmax(axis=1)[0])
+                    squareSample = squareSample.astype("float32") / 255.0
+                    samples.append(np.expand_dims(squareSample, axis=-1))
+                    coordinates.append((y // 50, x // 50))
                 else:
                     newCoordinates.add((y // 50, x // 50))
 
-                puzzle[y // 50, x // 50] = prediction
+        return coordinates, samples
+
+    def __extractSquaresGrid(self, newCoordinates):
+        # Same steps as __extractDigit, done once for the whole grid
+        thresholds = self.__otsuThresholds(self.__puzzleImage)
+        thresh = (self.__puzzleImage.reshape((9, 50, 9, 50)) <= thresholds[:, None, :, None]).astype("uint8") * 255
+        thresh = thresh.reshape((450, 450))
+
+        # Surround every square with a one pixel gap so no component crosses a square border
+        gapped = np.zeros((9, 52, 9, 52), dtype="uint8")
+        gapped[:, 1:51, :, 1:51] = thresh.reshape((9, 50, 9, 50))
+        gapped = gapped.reshape((468, 468))
+
+        # Clear components touching a square border, a component never leaves its square so its box tells
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(gapped, connectivity=8)
+        left, top = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        right, bottom = left + stats[:, cv2.CC_STAT_WIDTH] - 1, top + stats[:, cv2.CC_STAT_HEIGHT] - 1
+        inside = (left % 52 != 1) & (top % 52 != 1) & (right % 52 != 50) & (bottom % 52 != 50)
+        inside[0] = False
+        cleared = inside[labels].astype("uint8") * 255
+
+        # Fill holes so each component covers the same area as its filled outer contour
+        background = cleared.copy()
+        cv2.floodFill(background, None, (0, 0), 255)
+        filled = cleared | cv2.bitwise_not(background)
+
+        # Keep the largest component of every square
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(filled, connectivity=8)
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        squares = (stats[1:, cv2.CC_STAT_TOP] // 52) * 9 + stats[1:, cv2.CC_STAT_LEFT] // 52
+        largest = np.zeros(81, dtype=int)
+        np.maximum.at(largest, squares, areas)
+        keep = np.zeros(count, dtype=bool)
+        keep[1:] = areas == largest[squares]
+        mask = keep[labels].reshape((9, 52, 9, 52))[:, 1:51, :, 1:51]
+
+        # Fraction of each square covered by its digit, from the (9, 50, 9, 50) view
+        percentFilled = mask.sum(axis=(1, 3)) / 2500.0
+        hasDigit = percentFilled >= 0.03
+
+        # Masked digits of all squares, resized together to 28x28 per square
+        digits = np.where(mask, thresh.reshape((9, 50, 9, 50)), 0).astype("uint8").reshape((450, 450))
+        squareSamples = cv2.resize(digits, (252, 252)).reshape((9, 28, 9, 28)).transpose((0, 2, 1, 3))
+        squareSamples = squareSamples.astype("float32") / 255.0
+
+        coordinates = [(int(r), int(c)) for r, c in zip(*np.nonzero(hasDigit))]
+        newCoordinates.update((int(r), int(c)) for r, c in zip(*np.nonzero(~hasDigit)))
+        samples = np.expand_dims(squareSamples[hasDigit], axis=-1)
+
+        return coordinates, samples
 
-        return puzzle, newCoordinates
+    @staticmethod
+    def __otsuThresholds(image):
+        # Otsu's threshold of every square from one (81, 256) histogram, as cv2.threshold picks it
+        histogram = np.bincount((SQUARE_BINS + image).ravel(), minlength=81 * 256)
+        histogram = histogram.reshape((81, 256)) / 2500.0
+
+        omega = np.cumsum(histogram, axis=1)
+        mu = np.cumsum(histogram * np.arange(256), axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma = (mu[:, -1:] * omega - mu) ** 2 / (omega * (1 - omega))
+        sigma[~np.isfinite(sigma)] = 0
+
+        return sigma.argmax(axis=1).reshape((9, 9))
 
     @staticmethod
     def __extractDigit(cell):
         thresh = cv2.threshold(cell, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
-        thresh = clear_border(thresh)
+        thresh = segmentation.clear_border(thresh)
 
         cnts = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         cnts = imutils.grab_contours(cnts)
@@ -0,0 +1,65 @@
+import numpy as np
+from LazyImport import lazyImport
+
+cv2 = lazyImport("cv2")
+
+
+class RecognitionCache:
+    # Reuses the last recognition while the grid stays put and its warped image looks the same
+    __cornerTolerance = None
+    __hashThreshold = None
+    __corners = None
+    __hash = None
+    __result = None
+    __hits = 0
+    __misses = 0
+
+    def __init__(self, cornerTolerance=8, hashThreshold=3):
+        self.__cornerTolerance = cornerTolerance
+        self.__hashThreshold = hashThreshold
+
+    def lookup(self, corners, puzzleImage):
+        corners = self.orderCorners(corners)
+        imageHash = self.perceptualHash(puzzleImage)
+
+        if self.__result is not None \
+                and np.abs(corners - self.__corners).max() <= self.__cornerTolerance \
+                and bin(imageHash ^ self.__hash).count("1") <= self.__hashThreshold:
+            self.__hits += 1
+            return self.__result
+
+        self.__misses += 1
+        self.__corners = corners
+        self.__hash = imageHash
+        self.__result = None
+        return None
+
+    def store(self, result):
+        # result belongs to the corners and image of the last missed lookup
+        self.__result = result
+
+    def clear(self):
+        self.__corners = None
+        self.__hash = None
+        self.__result = None
+
+    def getStats(self):
+        return {"hits": self.__hits, "misses": self.__misses}
+
+    @staticmethod
+    def orderCorners(corners):
+        # top-left, bottom-left, bottom-right, top-right, as in extractGridFromCorners
+        corners = np.asarray(corners).reshape((4, 2))
+        sortedCoordinates = corners[corners[:, 0].argsort()]
+        leftSide = sortedCoordinates[:2]
+        rightSide = sortedCoordinates[2:]
+        topLeft, bottomLeft = leftSide[leftSide[:, 1].argsort()]
+        topRight, bottomRight = rightSide[rightSide[:, 1].argsort()]
+        return np.array([topLeft, bottomLeft, bottomRight, topRight], dtype=int)
+
+    @staticmethod
+    def perceptualHash(image, size=16):
+        # difference hash: one bit per horizontally adjacent pair of a tiny thumbnail
+        thumbnail = cv2.resize(image, (size + 1, size), interpolation=cv2.INTER_AREA)
+        bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+        return int("".join("1" if bit else "0" for bit in bits), 2)
@@ -0,0 +1,110 @@
+import shelve
+import threading
+from collections import OrderedDict
+from itertools import permutations
+import numpy as np
+
+LINE_ORDERS = [[3 * block + i for block in blocks for i in range(3)] for blocks in permutations(range(3))]
+DIGITS = np.arange(1, 10)
+
+# all 72 transforms as flat cell indices, candidate t of a grid is grid.flat[TRANSFORM_INDICES[t]]
+TRANSFORMS = [(transpose, rows, cols) for transpose in (False, True) for rows in LINE_ORDERS for cols in LINE_ORDERS]
+TRANSFORM_INDICES = np.array([(np.arange(81).reshape((9, 9)).T if transpose else np.arange(81).reshape((9, 9)))
+                              [np.ix_(rows, cols)].reshape(-1) for transpose, rows, cols in TRANSFORMS])
+TRANSFORM_POSITIONS = np.argsort(TRANSFORM_INDICES, axis=1)
+RELABEL_OFFSETS = 10 * np.arange(len(TRANSFORMS))[:, None]
+
+
+def canonicalForm(grid):
+    # Smallest relabeled grid over transposition and band/stack permutations
+    cells = np.asarray(grid).astype(int).reshape(-1)
+
+    # first position of every digit in every transform, unused digits are placed after all used ones in ascending order
+    filled = np.nonzero(cells)[0]
+    filled = filled[np.argsort(cells[filled], kind="stable")]
+    digits, starts = np.unique(cells[filled], return_index=True)
+    firstIndex = np.tile(81 + DIGITS, (len(TRANSFORMS), 1))
+    if len(filled):
+        firstIndex[:, digits - 1] = np.minimum.reduceat(TRANSFORM_POSITIONS[:, filled], starts, axis=1)
+
+    # relabel digits in order of first appearance
+    relabel = np.zeros((len(TRANSFORMS), 10), dtype=np.uint8)
+    np.put_along_axis(relabel, np.argsort(firstIndex, axis=1, kind="stable") + 1, DIGITS.astype(np.uint8), axis=1)
+    keys = (relabel.reshape(-1)[cells[TRANSFORM_INDICES] + RELABEL_OFFSETS] + ord("0")).view("S81").reshape(-1).tolist()
+
+    # the first of the smallest keys, in transform order
+    best = keys.index(min(keys))
+    transpose, rows, cols = TRANSFORMS[best]
+    return keys[best].decode("ascii"), (transpose, rows, cols, relabel[best].astype(int))
+
+
+def toCanonical(grid, transform):
+    transpose, rows, cols, relabel = transform
+    oriented = np.asarray(grid).T if transpose else np.asarray(grid)
+    return relabel[oriented[np.ix_(rows, cols)]]
+
+
+def fromCanonical(canonicalGrid, transform):
+    transpose, rows, cols, relabel = transform
+    inverse = np.zeros(10, dtype=int)
+    inverse[relabel] = np.arange(10)
+    oriented = np.zeros((9, 9), dtype=int)
+    oriented[np.ix_(rows, cols)] = inverse[np.asarray(canonicalGrid)]
+    return oriented.T if transpose else oriented
+
+
+class SolutionCache:
+    __entries = None
+    __maxSize = None
+    __store = None
+    __lock = None
+    __hits = 0
+    __misses = 0
+    __evictions = 0
+
+    def __init__(self, maxSize=1024, path=None):
+        self.__entries = OrderedDict()
+        self.__maxSize = maxSize
+        self.__store = shelve.open(path) if path else None
+        self.__lock = threading.Lock()
+
+    def get(self, grid, canonical=None):
+        # canonical is canonicalForm(grid) when the caller already has it
+        key, transform = canonical or canonicalForm(grid)
+        with self.__lock:
+            solution = self.__entries.get(key)
+            if solution is not None:
+                self.__entries.move_to_end(key)
+            elif self.__store is not None and key in self.__store:
+                solution = self.__store[key]
+                self.__insert(key, solution)
+
+            if solution is None:
+                self.__misses += 1
+                return None
+            self.__hits += 1
+
+        return fromCanonical(np.frombuffer(solution, dtype=np.uint8).reshape((9, 9)), transform)
+
+    def put(self, grid, solution, canonical=None):
+        key, transform = canonical or canonicalForm(grid)
+        canonicalSolution = toCanonical(solution, transform).astype(np.uint8).tobytes()
+        with self.__lock:
+            self.__insert(key, canonicalSolution)
+            if self.__store is not None:
+                self.__store[key] = canonicalSolution
+
+    def getStats(self):
+        return {"hits": self.__hits, "misses": self.__misses, "evictions": self.__evictions, "size": len(self.__entries)}
+
+    def close(self):
+        if self.__store is not None:
+            self.__store.close()
+            self.__store = None
+
+    def __insert(self, key, solution):
+        self.__entries[key] = solution
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.__maxSize:
+            self.__entries.popitem(last=False)
+            self.__evictions += 1
@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from BatchSolver import BatchSolver
+from DigitClassifier import loadDigitClassifier
+from Profiler import StageProfiler
+from PuzzleCorpus import formatPuzzle, parsePuzzle
+from SolutionCache import SolutionCache, canonicalForm
+from SudokuSolver import SudokuSolver
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class BatchingDigitReader:
+    # Coalesces predict calls from many threads into one forward pass, waiting at most maxWait for more samples
+    __digitReader = None
+    __requests = None
+    __maxWait = None
+    __maxSamples = None
+    __thread = None
+    __batches = 0
+    __calls = 0
+    __samples = 0
+
+    def __init__(self, digitReader, maxWait=0.005, maxSamples=81 * 16):
+        self.__digitReader = digitReader
+        self.__requests = queue.Queue()
+        self.__maxWait = maxWait
+        self.__maxSamples = maxSamples
+        self.__thread = threading.Thread(target=self.__run, name="digit-batcher", daemon=True)
+        self.__thread.start()
+
+    def predict(self, samples):
+        future = Future()
+        self.__requests.put((np.asarray(samples, dtype="float32"), future))
+        return future.result()
+
+    def getStats(self):
+        return {
+            "batches": self.__batches,
+            "calls": self.__calls,
+            "samples": self.__samples,
+            "calls_per_batch": self.__calls / self.__batches if self.__batches else 0.0,
+        }
+
+    def close(self):
+        self.__requests.put(None)
+        self.__thread.join()
+
+    def __run(self):
+        while True:
+            request = self.__requests.get()
+            if request is None:
+                return None
+
+            # the first call opens the window, later calls join until it closes or the batch is full
+            batch = [request]
+            count = len(request[0])
+            deadline = time.perf_counter() + self.__maxWait
+            while count < self.__maxSamples:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.__requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.__requests.put(None)
+                    break
+                batch.append(request)
+                count += len(request[0])
+
+            self.__predictBatch(batch, count)
+
+    def __predictBatch(self, batch, count):
+        try:
+            probabilities = self.__digitReader.predict(np.concatenate([samples for samples, _ in batch]))
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return None
+
+        self.__batches += 1
+        self.__calls += len(batch)
+        self.__samples += count
+        start = 0
+        for samples, future in batch:
+            future.set_result(probabilities[start:start + len(samples)])
+            start += len(samples)
+
+
+class SolveService:
+    # Serves POST /solve/image (an image file as the body), POST /solve/grid (81 digits) and GET /stats
+    __digitReader = None
+    __executor = None
+    __local = None
+    __engine = None
+    __contourMode = None
+    __recoveryBudget = None
+    __solutionCache = None
+    __profiler = None
+    __requests = 0
+
+    def __init__(self, digitReader, workers=4, engine="bitmask", contourMode="largest-quad", recoveryBudget=0.2,
+                 maxWait=0.005):
+        self.__digitReader = BatchingDigitReader(digitReader, maxWait)
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="solver")
+        self.__local = threading.local()
+        self.__engine = engine
+        self.__contourMode = contourMode
+        self.__recoveryBudget = recoveryBudget
+        self.__solutionCache = SolutionCache()
+        self.__profiler = StageProfiler()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.__handleConnection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.__executor.shutdown(wait=True)
+        self.__digitReader.close()
+
+    # Work done on the executor threads, every thread keeps its own solvers
+    def __getBatchSolver(self):
+        if not hasattr(self.__local, "batchSolver"):
+            self.__local.batchSolver = BatchSolver(self.__digitReader, self.__engine, self.__contourMode,
+                                                   self.__profiler, self.__recoveryBudget)
+        return self.__local.batchSolver
+
+    def __getSudokuSolver(self):
+        if not hasattr(self.__local, "sudokuSolver"):
+            self.__local.sudokuSolver = SudokuSolver(engine=self.__engine)
+        return self.__local.sudokuSolver
+
+    def solveImage(self, data):
+        return self.__getBatchSolver().solveEncodedImage(data)
+
+    def solveGrid(self, text):
+        result = {"givens": None, "status": None, "solution": None, "unique": None, "timings": {}}
+        start = time.perf_counter()
+        grid = parsePuzzle(text)
+        result["givens"] = formatPuzzle(grid)
+
+        sudokuSolver = self.__getSudokuSolver()
+        sudokuSolver.setGrid(grid)
+        if not SudokuSolver.isValidPuzzle(grid):
+            result["status"] = "invalid"
+        else:
+            # only puzzles with exactly one solution are cached, so a hit is unique; other puzzles are searched again
+            canonical = canonicalForm(grid)
+            solution = self.__solutionCache.get(grid, canonical)
+            if solution is not None:
+                count = 1
+            else:
+                # one search counts up to two solutions and keeps the first
+                solution = np.zeros((9, 9), dtype=int)
+                count = sudokuSolver.countSolutions(2, solution)
+                if count == 1:
+                    self.__solutionCache.put(grid, solution, canonical)
+            result["unique"] = count == 1
+            if count:
+                result["status"] = "solved"
+                result["solution"] = formatPuzzle(solution)
+            else:
+                result["status"] = "unsolvable"
+
+        result["timings"]["total_ms"] = (time.perf_counter() - start) * 1000
+        return result
+
+    def getStats(self):
+        return {
+            "requests": self.__requests,
+            "batching": self.__digitReader.getStats(),
+            "solution_cache": self.__solutionCache.getStats(),
+            "stages": self.__profiler.getStats(),
+        }
+
+    # HTTP/1.1 with keep-alive, one request at a time per connection
+    async def __handleConnection(self, reader, writer):
+        try:
+            while True:
+                request = await self.__readRequest(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.__route(method, path, body)
+                keepAlive = headers.get("connection", "").lower() != "close"
+                self.__writeResponse(writer, status, payload, keepAlive)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as error:
+            self.__writeResponse(writer, 400, {"error": str(error)}, False)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def __readRequest(reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise ValueError("Malformed request line.")
+        method, path, _ = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_SIZE:
+            raise ValueError("Request body is larger than %d bytes." % MAX_BODY_SIZE)
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?")[0], headers, body
+
+    async def __route(self, method, path, body):
+        routes = {
+            "/solve/image": ("POST", lambda: self.solveImage(body)),
+            "/solve/grid": ("POST", lambda: self.solveGrid(body.decode("ascii", "replace"))),
+            "/stats": ("GET", self.getStats),
+        }
+        if path not in routes:
+            return 404, {"error": "Unknown path '%s'." % path}
+        if method != routes[path][0]:
+            return 405, {"error": "Use %s for %s." % (routes[path][0], path)}
+
+        self.__requests += 1
+        try:
+            return 200, await asyncio.get_running_loop().run_in_executor(self.__executor, routes[path][1])
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        except Exception as error:
+            return 500, {"error": "%s: %s" % (type(error).__name__, error)}
+
+    @staticmethod
+    def __writeResponse(writer, status, payload, keepAlive):
+        body = json.dumps(payload).encode()
+        head = "HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n" \
+               % (status, REASONS[status], len(body), "keep-alive" if keepAlive else "close")
+        writer.write(head.encode("latin-1") + body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the recognizer and solver over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="model/digitReader.npz", help="exported .npz weights, an int8 .tflite model or a Keras .h5 model")
+    parser.add_argument("--engine", choices=SudokuSolver.ENGINES, default="bitmask")
+    parser.add_argument("--contour", choices=("largest-quad", "largest"), default="largest-quad")
+    parser.add_argument("--workers", type=int, default=4, help="executor threads, requests only share a batch when several run at once")
+    parser.add_argument("--batch-wait", type=float, default=5, help="milliseconds predict calls wait to share a batch")
+    parser.add_argument("--recovery-budget", type=float, default=200, help="milliseconds spent retrying misread digits")
+    args = parser.parse_args()
+
+    service = SolveService(loadDigitClassifier(args.model), args.workers, args.engine, args.contour,
+                           args.recovery_budget / 1000, args.batch_wait / 1000)
+    print("Serving on http://%s:%d" % (args.host, args.port))
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
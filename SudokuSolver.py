@@ -1,11 +1,31 @@
 import numpy as np
+from BitmaskSolver import BitmaskSolver
+from DancingLinksSolver import DancingLinksSolver
+from SolutionCache import canonicalForm
 
 
 class SudokuSolver:
-    __grid = None
+    ENGINES = ("backtracking", "bitmask", "dlx")
+    ENGINE_CLASSES = {"bitmask": BitmaskSolver, "dlx": DancingLinksSolver}
+
+    # dlx gives up after this many seconds and the bitmask engine finishes the puzzle
+    DLX_TIME_BUDGET = 0.05
 
-    def __init__(self, grid=None):
+    __grid = None
+    __engine = None
+    __engineSolvers = None
+    __solutionCache = None
+    __nodes = 0
+    __backtracks = 0
+    __solutions = 0
+    __limit = 1
+    __firstSolution = None
+
+    def __init__(self, grid=None, engine="backtracking", solutionCache=None):
         self.__grid = grid
+        self.__solutionCache = solutionCache
+        self.__engineSolvers = {}
+        self.setEngine(engine)
 
     def hasGrid(self):
         return self.__grid is not None
@@ -13,22 +33,118 @@ class SudokuSolver:
     def setGrid(self, grid):
         self.__grid = grid
 
+    def getEngine(self):
+        return self.__engine
+
+    def setEngine(self, engine):
+        if engine not in self.ENGINES:
+            raise ValueError("Unknown solver engine '%s', expected one of %s." % (engine, ", ".join(self.ENGINES)))
+        self.__engine = engine
+
+        # engine objects are built once and reused for every later puzzle
+        if engine == "dlx" and engine not in self.__engineSolvers:
+            self.__engineSolvers[engine] = DancingLinksSolver(self.DLX_TIME_BUDGET)
+        elif engine in self.ENGINE_CLASSES and engine not in self.__engineSolvers:
+            self.__engineSolvers[engine] = self.ENGINE_CLASSES[engine]()
+
+    def getStats(self):
+        return {"nodes": self.__nodes, "backtracks": self.__backtracks}
+
     def solveSudoku(self):
-        return self.__backtracking() if self.hasGrid() else None
+        if not self.hasGrid():
+            return None
+        if self.__solutionCache is None:
+            return self.__solve()
+
+        # equivalent puzzles share one cached solution
+        canonical = canonicalForm(self.__grid)
+        solution = self.__solutionCache.get(self.__grid, canonical)
+        if solution is not None:
+            self.__nodes = 0
+            self.__backtracks = 0
+            self.__grid[:, :] = solution
+            return True
+
+        givens = self.__grid.copy()
+        solved = self.__solve()
+        if solved:
+            self.__solutionCache.put(givens, self.__grid, canonical)
+        return solved
+
+    def countSolutions(self, limit=2, solution=None):
+        # Stops at limit solutions (None counts all of them), the grid is left unchanged;
+        # the first solution found is copied into solution when one is given
+        if not self.hasGrid():
+            return None
+        if not self.isValidPuzzle(self.__grid):
+            return 0
+
+        if self.__engine in self.__engineSolvers:
+            engineSolver = self.__engineSolvers[self.__engine]
+            count = engineSolver.countSolutions(self.__grid, limit, solution)
+            if count is None:
+                engineSolver = self.__getFallbackSolver()
+                count = engineSolver.countSolutions(self.__grid, limit, solution)
+            self.__nodes = engineSolver.getNodes()
+            self.__backtracks = engineSolver.getBacktracks()
+            return count
+
+        grid = self.__grid
+        self.__grid = grid.copy()
+        try:
+            self.__runBacktracking(limit or 0)
+        finally:
+            self.__grid = grid
+        if solution is not None and self.__firstSolution is not None:
+            solution[:, :] = self.__firstSolution
+        return self.__solutions
+
+    def hasUniqueSolution(self):
+        return self.countSolutions(2) == 1
+
+    def __solve(self):
+        if self.__engine in self.__engineSolvers:
+            engineSolver = self.__engineSolvers[self.__engine]
+            solved = engineSolver.solve(self.__grid)
+            if solved is None:
+                engineSolver = self.__getFallbackSolver()
+                solved = engineSolver.solve(self.__grid)
+            self.__nodes = engineSolver.getNodes()
+            self.__backtracks = engineSolver.getBacktracks()
+            return solved
+        return self.__runBacktracking(1)
+
+    def __getFallbackSolver(self):
+        if "bitmask" not in self.__engineSolvers:
+            self.__engineSolvers["bitmask"] = BitmaskSolver()
+        return self.__engineSolvers["bitmask"]
+
+    def __runBacktracking(self, limit):
+        self.__nodes = 0
+        self.__backtracks = 0
+        self.__solutions = 0
+        self.__limit = limit
+        self.__firstSolution = None
+        return self.__backtracking()
 
     def __backtracking(self):
         if self.__isComplete():
-            return True
+            self.__solutions += 1
+            if self.__firstSolution is None:
+                self.__firstSolution = self.__grid.copy()
+            return self.__solutions == self.__limit
 
         r, c = self.__findNextBlankCell()
 
         for i in range(1, 10):
             if self.__meetsConstraints(r, c, i):
+                self.__nodes += 1
                 self.__grid[r, c] = i
                 flag = self.__backtracking()
                 if flag:
                     return True
                 self.__grid[r, c] = 0
+                self.__backtracks += 1
 
         return False
 
@@ -53,79 +169,34 @@ class SudokuSolver:
 
     @staticmethod
     def isValidPuzzle(grid):
-        seen = set()
-        # check all horizontal
-        for r in range(9):
-            for c in range(9):
-                val = grid[r, c]
-                if val != 0:
-                    if val in seen:
-                        return False
-                    seen.add(val)
-            seen.clear()
-
-        # check all vertical
-        for c in range(9):
-            for r in range(9):
-                val = grid[r, c]
-                if val != 0:
-                    if val in seen:
-                        return False
-                    seen.add(val)
-            seen.clear()
-
-        # check all 3x3 squares
-        for c in range(0, 9, 3):
-            for r in range(0, 9, 3):
-                for j in range(c, c + 3):
-                    for i in range(r, r + 3):
-                        val = grid[i, j]
-                        if val != 0:
-                            if val in seen:
-                                return False
-                            seen.add(val)
-                seen.clear()
+        return bool(SudokuSolver.areValidPuzzles(np.asarray(grid)[None])[0])
 
-        return True
+    @staticmethod
+    def areValidPuzzles(grids):
+        # no digit may appear twice in a row, column or 3x3 square of any grid
+        rows, cols, boxes = SudokuSolver.__countDigits(np.asarray(grids))
+        return (rows.max(axis=(1, 2)) <= 1) & (cols.max(axis=(1, 2)) <= 1) & (boxes.max(axis=(1, 2, 3)) <= 1)
 
     @staticmethod
     def getAllConflicts(grid):
-        conflicts = set()
-        lookupTable = dict()
-
-        # row conflicts
-        for row in range(9):
-            for col in range(9):
-                if not grid[row, col] == 0:
-                    if grid[row, col] in lookupTable:
-                        conflicts.add((row, col))
-                        conflicts.add((lookupTable[grid[row, col]]))
-                    else:
-                        lookupTable[grid[row, col]] = (row, col)
-            lookupTable.clear()
-
-        # column conflicts
-        for col in range(9):
-            for row in range(9):
-                if not grid[row, col] == 0:
-                    if grid[row, col] in lookupTable:
-                        conflicts.add((row, col))
-                        conflicts.add((lookupTable[grid[row, col]]))
-                    else:
-                        lookupTable[grid[row, col]] = (row, col)
-            lookupTable.clear()
-
-        # 3x3 square conflicts
-        for c in range(0, 9, 3):
-            for r in range(0, 9, 3):
-                for j in range(c, c + 3):
-                    for i in range(r, r + 3):
-                        if not grid[i, j] == 0:
-                            if grid[i, j] in lookupTable:
-                                conflicts.add((i, j))
-                                conflicts.add((lookupTable[grid[i, j]]))
-                            else:
-                                lookupTable[grid[i, j]] = (i, j)
-                lookupTable.clear()
-
-        return conflicts
+        grid = np.asarray(grid)
+        rows, cols, boxes = SudokuSolver.__countDigits(grid[None])
+
+        # a cell conflicts when its digit is repeated in any of its units
+        repeated = (rows[0, :, None, :] > 1) | (cols[0, None, :, :] > 1) | (boxes[0].repeat(3, axis=0).repeat(3, axis=1) > 1)
+        conflicts = (SudokuSolver.__oneHot(grid) & repeated).any(axis=2)
+
+        return {(int(r), int(c)) for r, c in zip(*np.nonzero(conflicts))}
+
+    @staticmethod
+    def __oneHot(grids):
+        return grids[..., None] == np.arange(1, 10)
+
+    @staticmethod
+    def __countDigits(grids):
+        # (N, 9, 9, 9) one-hot grids counted along rows, columns and 3x3 squares
+        oneHot = SudokuSolver.__oneHot(grids).astype(np.int8)
+        rows = oneHot.sum(axis=2)
+        cols = oneHot.sum(axis=1)
+        boxes = oneHot.reshape((-1, 3, 3, 3, 3, 9)).sum(axis=(2, 4))
+        return rows, cols, boxes
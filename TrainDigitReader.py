@@ -1,4 +1,11 @@
+import argparse
+import json
+import os
+import sys
+import time
 import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
 from tensorflow.keras.datasets import mnist
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Conv2D
@@ -7,7 +14,45 @@ from tensorflow.keras.layers import Activation
 from tensorflow.keras.layers import Flatten
 from tensorflow.keras.layers import Dense
 from tensorflow.keras.layers import Dropout
-from tensorflow.keras.utils import to_categorical
+from PrintedDigits import renderPrintedDigits
+
+# resource is Unix only, peak memory is not logged without it
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class TrainingLogger(Callback):
+    # Logs wall time and peak resident memory of every epoch
+    epochs = None
+    __start = None
+
+    def __init__(self):
+        super().__init__()
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.__start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        entry = {
+            "epoch": epoch + 1,
+            "seconds": time.perf_counter() - self.__start,
+            "peak_rss_mb": self.peakMemoryMb(),
+        }
+        entry.update({key: float(value) for key, value in (logs or {}).items()})
+        self.epochs.append(entry)
+        peakMemory = "unknown" if entry["peak_rss_mb"] is None else "%.0f MB" % entry["peak_rss_mb"]
+        print("Epoch %d took %.1f s, peak RSS %s" % (entry["epoch"], entry["seconds"], peakMemory))
+
+    @staticmethod
+    def peakMemoryMb():
+        if resource is None:
+            return None
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
 
 
 class TrainDigitReader:
@@ -15,27 +60,67 @@ class TrainDigitReader:
     __x_test = None
     __y_train = None
     __y_test = None
+    __trainDataset = None
+    __validationDataset = None
+    __testDataset = None
     __numClasses = None
     __inputShape = None
+    __batchSize = None
+    __epochs = None
+    __validationSplit = None
+    __syntheticSamples = None
+    __fonts = None
+    __shuffleBuffer = None
+    __seed = None
+    __logger = None
     digitReader = None
 
-    def __init__(self):
-        # MNIST dataset training and test sets
+    def __init__(self, batchSize=128, epochs=15, validationSplit=0.1, syntheticSamples=0, fonts=None,
+                 shuffleBuffer=10000, seed=0):
+        # MNIST dataset training and test sets, kept as uint8 and normalized on the fly
         (self.__x_train, self.__y_train), (self.__x_test, self.__y_test) = mnist.load_data()
         self.__numClasses = 10
         self.__inputShape = (28, 28, 1)
+        self.__batchSize = batchSize
+        self.__epochs = epochs
+        self.__validationSplit = validationSplit
+        self.__syntheticSamples = syntheticSamples
+        self.__fonts = fonts
+        self.__shuffleBuffer = shuffleBuffer
+        self.__seed = seed
+        self.__logger = TrainingLogger()
+
+    @staticmethod
+    def __normalize(images, labels):
+        # Scale images to the [0, 1] range with shape (28, 28, 1)
+        return tf.expand_dims(tf.cast(images, tf.float32) / 255, -1), labels
 
     def preprocessModel(self):
-        # Scale images to the [0, 1] range
-        self.__x_train = self.__x_train.astype("float32") / 255
-        self.__x_test = self.__x_test.astype("float32") / 255
-        # Make sure images have shape (28, 28, 1)
-        self.__x_train = np.expand_dims(self.__x_train, -1)
-        self.__x_test = np.expand_dims(self.__x_test, -1)
+        # same split as fit(validation_split=...): the last images are held out
+        split = int(len(self.__x_train) * (1 - self.__validationSplit))
+        train = tf.data.Dataset.from_tensor_slices((self.__x_train[:split], self.__y_train[:split]))
+        validation = tf.data.Dataset.from_tensor_slices((self.__x_train[split:], self.__y_train[split:]))
 
-        # convert class vectors to binary class matrices
-        self.__y_train = to_categorical(self.__y_train, self.__numClasses)
-        self.__y_test = to_categorical(self.__y_test, self.__numClasses)
+        # mix printed digits into the handwritten ones in proportion to their counts
+        if self.__syntheticSamples > 0:
+            images, labels = renderPrintedDigits(self.__syntheticSamples, self.__fonts, self.__seed)
+            printed = tf.data.Dataset.from_tensor_slices((images, labels))
+            weight = self.__syntheticSamples / (self.__syntheticSamples + split)
+            train = tf.data.Dataset.sample_from_datasets([train, printed], weights=[1 - weight, weight], seed=self.__seed)
+
+        self.__trainDataset = train.cache() \
+            .shuffle(self.__shuffleBuffer, seed=self.__seed, reshuffle_each_iteration=True) \
+            .batch(self.__batchSize) \
+            .map(self.__normalize, num_parallel_calls=tf.data.AUTOTUNE) \
+            .prefetch(tf.data.AUTOTUNE)
+        self.__validationDataset = validation.batch(self.__batchSize).map(self.__normalize).cache().prefetch(tf.data.AUTOTUNE)
+        self.__testDataset = self.__testBatches(self.__batchSize)
+
+    def __testBatches(self, batchSize):
+        return tf.data.Dataset.from_tensor_slices((self.__x_test, self.__y_test)) \
+            .batch(batchSize) \
+            .map(self.__normalize) \
+            .prefetch(tf.data.AUTOTUNE)
 
     def buildModel(self):
         self.digitReader = Sequential(
@@ -63,16 +148,91 @@ class TrainDigitReader:
         )
         self.digitReader.summary()
 
-    def compileModel(self):
-        self.digitReader.compile(loss="categorical_crossentropy", optimizer="adam", metrics=["accuracy"])
-        self.digitReader.fit(self.__x_train, self.__y_train, batch_size=128, epochs=15, validation_split=0.1)
-        score = self.digitReader.evaluate(self.__x_test, self.__y_test, verbose=0)
+    def compileModel(self, modelPath="model/digitReader.h5"):
+        self.digitReader.compile(loss="sparse_categorical_crossentropy", optimizer="adam", metrics=["accuracy"])
+        self.digitReader.fit(self.__trainDataset, validation_data=self.__validationDataset, epochs=self.__epochs,
+                             callbacks=[self.__logger])
+        score = self.digitReader.evaluate(self.__testDataset, verbose=0)
         print("Test loss:", score[0])
         print("Test accuracy:", score[1])
-        self.digitReader.save("model/digitReader.h5")
+        self.digitReader.save(modelPath)
+
+    def getTrainingLog(self):
+        return self.__logger.epochs
+
+    def quantizeModel(self, outputPath="model/digitReader_int8.tflite", calibrationSamples=500):
+        # Full integer quantization, activation ranges are calibrated on MNIST training images
+        def representativeDataset():
+            for i in range(calibrationSamples):
+                yield [np.expand_dims(self.__x_train[i:i + 1].astype("float32") / 255, -1)]
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.digitReader)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representativeDataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+        with open(outputPath, "wb") as file:
+            file.write(converter.convert())
+
+    def compareModels(self, modelPaths, batchSize=81, repeats=50, reportPath="model/digitReader_quantization_report.json"):
+        # Accuracy, size and CPU latency of each saved digit reader artifact
+        from DigitClassifier import loadDigitClassifier
+
+        batch = np.expand_dims(self.__x_test[:batchSize].astype("float32") / 255, -1)
+        report = {"batch_size": batchSize, "models": []}
+
+        for path in modelPaths:
+            digitReader = loadDigitClassifier(path)
+            predictions = np.concatenate([digitReader.predict(images.numpy()) for images, _ in self.__testBatches(1000)])
+
+            digitReader.predict(batch)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                digitReader.predict(batch)
+            latency = (time.perf_counter() - start) / repeats
+
+            report["models"].append({
+                "path": path,
+                "test_accuracy": float((predictions.argmax(axis=1) == self.__y_test).mean()),
+                "size_bytes": os.path.getsize(path),
+                "batch_latency_ms": latency * 1000,
+            })
+
+        for model in report["models"]:
+            print("%-32s accuracy %.4f  size %8d bytes  latency %7.2f ms/batch"
+                  % (model["path"], model["test_accuracy"], model["size_bytes"], model["batch_latency_ms"]))
+        with open(reportPath, "w") as file:
+            json.dump(report, file, indent=2)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the digit reader on MNIST, optionally mixed with printed digits.")
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--synthetic-samples", type=int, default=0, help="printed digits rendered and mixed into training")
+    parser.add_argument("--fonts", nargs="*", default=None, help=".ttf/.otf files for printed digits (defaults to OpenCV fonts)")
+    parser.add_argument("--output", default="model/digitReader.h5")
+    parser.add_argument("--log", default=None, help="write per-epoch time and peak memory as JSON")
+    parser.add_argument("--skip-quantization", action="store_true")
+    args = parser.parse_args()
+
+    objTrainer = TrainDigitReader(args.batch_size, args.epochs, syntheticSamples=args.synthetic_samples, fonts=args.fonts)
+    objTrainer.preprocessModel()
+    objTrainer.buildModel()
+    objTrainer.compileModel(args.output)
+    if args.log:
+        with open(args.log, "w") as file:
+            json.dump(objTrainer.getTrainingLog(), file, indent=2)
+
+    if not args.skip_quantization:
+        quantizedPath = os.path.splitext(args.output)[0] + "_int8.tflite"
+        objTrainer.quantizeModel(quantizedPath)
+        reportPath = os.path.splitext(args.output)[0] + "_quantization_report.json"
+        objTrainer.compareModels([args.output, quantizedPath], reportPath=reportPath)
 
 
-objTrainer = TrainDigitReader()
-objTrainer.preprocessModel()
-objTrainer.buildModel()
-objTrainer.compileModel()
+if __name__ == "__main__":
+    main()
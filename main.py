@@ -1,3 +1,19 @@
-from App import App
+import argparse
+import json
+from Profiler import startupProfiler
+
+parser = argparse.ArgumentParser(description="Sudoku Solver CV")
+parser.add_argument("--startup-report", nargs="?", const="-", default=None, metavar="FILE",
+                    help="print a startup time breakdown, or write it as JSON to FILE on exit")
+args = parser.parse_args()
+if args.startup_report is not None:
+    startupProfiler.enable()
+
+with startupProfiler.measure("import App"):
+    from App import App
 
 myApp = App()
+
+if args.startup_report not in (None, "-"):
+    with open(args.startup_report, "w") as file:
+        json.dump(startupProfiler.getReport(), file, indent=2)
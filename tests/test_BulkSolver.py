@@ -0,0 +1,69 @@
+import glob
+import os
+import unittest
+import numpy as np
+from BulkSolver import BulkSolver
+from PuzzleCorpus import parsePuzzle, readPuzzles
+from SudokuSolver import SudokuSolver
+
+PUZZLE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "puzzles")
+
+# a digit given twice in the first row
+DUPLICATE_GIVENS = "1" + "0" * 7 + "1" + "0" * 72
+# no digit is repeated, but the last square of the first row has no candidate left
+NO_CANDIDATE = "12345678" + "0" * 8 + "9" + "0" * 64
+# both blanks of the first row can only take an 8, the clash only shows up after propagation
+CLASHING_SINGLES = "123456700" + "0" * 27 + "000000090" + "0" * 18 + "000000009" + "0" * 9
+
+
+def solveOne(grid):
+    solution = np.asarray(grid, dtype=int).copy()
+    solved = SudokuSolver(solution, "bitmask").solveSudoku()
+    return solution if solved else None
+
+
+def placeWrongDigit(puzzle, solution):
+    # a blank square given a digit that fits its units but not the solution
+    for row, col in zip(*np.nonzero(puzzle == 0)):
+        for digit in range(1, 10):
+            grid = puzzle.copy()
+            grid[row, col] = digit
+            if digit != solution[row, col] and SudokuSolver.isValidPuzzle(grid):
+                return grid
+    return None
+
+
+class BulkSolverTest(unittest.TestCase):
+    def testCorpusMatchesBitmaskSolver(self):
+        givens = np.array([grid for path in sorted(glob.glob(os.path.join(PUZZLE_DIRECTORY, "*.txt")))
+                           for grid in readPuzzles(path)], dtype="uint8")
+        solutions, solved = BulkSolver().solveArray(givens)
+
+        self.assertTrue(solved.all())
+        for grid, solution in zip(givens, solutions):
+            np.testing.assert_array_equal(solution, solveOne(grid))
+
+    def testInconsistentPuzzlesKeepTheirGivens(self):
+        puzzle = next(readPuzzles(os.path.join(PUZZLE_DIRECTORY, "hard.txt")))
+        solution = solveOne(puzzle)
+        wrongDigit = placeWrongDigit(puzzle, solution)
+
+        self.assertTrue(SudokuSolver.isValidPuzzle(parsePuzzle(CLASHING_SINGLES)))
+        givens = np.array([puzzle, parsePuzzle(DUPLICATE_GIVENS), parsePuzzle(NO_CANDIDATE),
+                           parsePuzzle(CLASHING_SINGLES), wrongDigit], dtype="uint8")
+        bulkSolver = BulkSolver()
+        solutions, solved = bulkSolver.solveArray(givens)
+
+        np.testing.assert_array_equal(solved, [True, False, False, False, False])
+        np.testing.assert_array_equal(solutions[0], solution)
+        np.testing.assert_array_equal(solutions[1:], givens[1:])
+        self.assertEqual(bulkSolver.getStats()["puzzles"], 5)
+        self.assertEqual(bulkSolver.getStats()["unsolved"], 4)
+
+    def testPropagateFlagsClashingSingles(self):
+        cells = parsePuzzle(CLASHING_SINGLES).reshape((1, 81)).astype("uint8")
+        self.assertFalse(BulkSolver.propagate(cells)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
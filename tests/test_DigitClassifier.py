@@ -0,0 +1,25 @@
+import os
+import unittest
+import numpy as np
+from DigitClassifier import NumpyDigitClassifier, loadDigitClassifier
+from PrintedDigits import renderPrintedDigits
+
+MODEL_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model")
+
+
+class DigitClassifierParityTest(unittest.TestCase):
+    # The exported NumPy runtime has to read every square the way the Keras model does
+    def testArgmaxMatchesKeras(self):
+        images, _ = renderPrintedDigits(500, seed=0)
+        samples = np.concatenate([images, np.zeros((20, 28, 28), dtype="uint8")])
+        samples = np.expand_dims(samples.astype("float32") / 255, -1)
+
+        expected = loadDigitClassifier(os.path.join(MODEL_DIRECTORY, "digitReader.h5")).predict(samples, verbose=0)
+        actual = NumpyDigitClassifier(os.path.join(MODEL_DIRECTORY, "digitReader.npz")).predict(samples)
+
+        np.testing.assert_array_equal(actual.argmax(axis=1), expected.argmax(axis=1))
+        np.testing.assert_allclose(actual, expected, atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
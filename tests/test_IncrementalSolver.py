@@ -0,0 +1,76 @@
+import glob
+import os
+import unittest
+import numpy as np
+from BitmaskSolver import BitmaskSolver
+from IncrementalSolver import IncrementalSolver
+from PuzzleCorpus import readPuzzles
+from SudokuSolver import SudokuSolver
+
+PUZZLE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "puzzles")
+
+
+def expectedCandidates(grid, row, col):
+    box = grid[row // 3 * 3:row // 3 * 3 + 3, col // 3 * 3:col // 3 * 3 + 3]
+    return [digit for digit in range(1, 10) if digit not in grid[row] and digit not in grid[:, col] and digit not in box]
+
+
+class IncrementalSolverTest(unittest.TestCase):
+    # Random edits of corpus puzzles, every local update has to match a full recomputation
+    def testEditsMatchFullRecomputation(self):
+        rng = np.random.default_rng(0)
+        bitmaskSolver = BitmaskSolver()
+        for path in sorted(glob.glob(os.path.join(PUZZLE_DIRECTORY, "*.txt"))):
+            for puzzle in readPuzzles(path):
+                incrementalSolver = IncrementalSolver(puzzle)
+                grid = puzzle.copy()
+                for _ in range(100):
+                    row, col = (int(i) for i in rng.integers(9, size=2))
+                    value = int(rng.integers(1, 10)) if rng.random() < 0.6 else 0
+                    # typing the solution's digit keeps the cached solution valid
+                    solution = incrementalSolver.getSolution()
+                    if solution is not None and grid[row, col] == 0 and rng.random() < 0.5:
+                        value = int(solution[row, col])
+
+                    before = incrementalSolver.getConflicts()
+                    changed = incrementalSolver.setCell(row, col, value)
+                    grid[row, col] = value
+
+                    conflicts = SudokuSolver.getAllConflicts(grid)
+                    np.testing.assert_array_equal(incrementalSolver.getGrid(), grid)
+                    self.assertEqual(incrementalSolver.getConflicts(), conflicts)
+                    self.assertEqual(changed, before ^ conflicts)
+                    self.assertEqual(incrementalSolver.hasConflict(row, col), (row, col) in conflicts)
+                    for i, j in ((row, col), divmod(int(rng.integers(81)), 9)):
+                        if grid[i, j] == 0:
+                            self.assertEqual(incrementalSolver.getCandidates(i, j), expectedCandidates(grid, i, j))
+
+                    expected = grid.copy()
+                    solvable = not conflicts and bitmaskSolver.solve(expected)
+                    solution = incrementalSolver.getSolution()
+                    self.assertEqual(solution is not None, bool(solvable))
+                    if solution is not None:
+                        self.assertTrue((solution != 0).all() and SudokuSolver.isValidPuzzle(solution))
+                        np.testing.assert_array_equal(solution[grid != 0], grid[grid != 0])
+
+    def testLoadAndClear(self):
+        incrementalSolver = IncrementalSolver()
+        self.assertEqual(incrementalSolver.getCandidates(4, 4), list(range(1, 10)))
+
+        grid = np.zeros((9, 9), dtype=int)
+        grid[0, 0] = grid[0, 8] = 5
+        incrementalSolver.load(grid)
+        self.assertEqual(incrementalSolver.getConflicts(), {(0, 0), (0, 8)})
+        self.assertIsNone(incrementalSolver.getSolution())
+
+        self.assertEqual(incrementalSolver.clearCell(0, 8), {(0, 0), (0, 8)})
+        self.assertEqual(incrementalSolver.getConflicts(), set())
+        self.assertEqual(incrementalSolver.setCell(0, 8, 0), set())
+        self.assertNotIn(5, incrementalSolver.getCandidates(0, 4))
+        self.assertIsNotNone(incrementalSolver.getSolution())
+        with self.assertRaises(ValueError):
+            incrementalSolver.setCell(0, 1, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import glob
+import os
+import tempfile
+import unittest
+import numpy as np
+from PuzzleCorpus import (BinaryCorpus, BinaryCorpusWriter, HEADER_SIZE, PACKED_RECORD_SIZE, UNPACKED_RECORD_SIZE,
+                          binaryToText, formatPuzzles, isBinaryCorpus, packCells, readPuzzleChunks, readPuzzles,
+                          textToBinary, unpackCells)
+
+PUZZLE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "puzzles")
+
+
+class PuzzleCorpusTest(unittest.TestCase):
+    # Text files converted to a binary corpus and back have to give the same puzzles, packed or not
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.lines = []
+        for path in sorted(glob.glob(os.path.join(PUZZLE_DIRECTORY, "*.txt"))):
+            with open(path) as file:
+                self.lines += [line.strip() for line in file if line.strip() and not line.startswith("#")]
+
+        # comments, blank lines and '.' blanks are only part of the text format
+        self.textPath = os.path.join(self.directory.name, "puzzles.txt")
+        with open(self.textPath, "w") as file:
+            file.write("# corpus\n\n" + "\n".join(self.lines) + "\n")
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def testRoundTrip(self):
+        expected = [line.replace(".", "0") for line in self.lines]
+        for packed, recordSize in ((False, UNPACKED_RECORD_SIZE), (True, PACKED_RECORD_SIZE)):
+            binaryPath, textPath = self.path("puzzles%d.sdk" % packed), self.path("puzzles%d.txt" % packed)
+            textToBinary(self.textPath, binaryPath, packed, chunkSize=4)
+            binaryToText(binaryPath, textPath, chunkSize=4)
+
+            self.assertTrue(isBinaryCorpus(binaryPath))
+            self.assertFalse(isBinaryCorpus(textPath))
+            self.assertEqual(os.path.getsize(binaryPath), HEADER_SIZE + len(expected) * recordSize)
+            with open(textPath) as file:
+                self.assertEqual(file.read().split(), expected)
+
+            corpus = BinaryCorpus(binaryPath)
+            self.assertEqual(len(corpus), len(expected))
+            self.assertEqual(corpus.isPacked(), packed)
+            self.assertEqual(formatPuzzles(corpus.getGrids(0, len(corpus))), expected)
+            self.assertEqual([formatPuzzles(grid)[0] for grid in readPuzzles(binaryPath)], expected)
+            chunks = list(readPuzzleChunks(binaryPath, 4))
+            self.assertEqual([len(chunk) for chunk in chunks[:-1]], [4] * (len(chunks) - 1))
+            self.assertEqual(formatPuzzles(np.concatenate(chunks)), expected)
+
+    def testTextAndBinaryReadTheSame(self):
+        binaryPath = self.path("puzzles.sdk")
+        textToBinary(self.textPath, binaryPath, packed=True)
+        for fromText, fromBinary in zip(readPuzzles(self.textPath), readPuzzles(binaryPath)):
+            np.testing.assert_array_equal(fromText, fromBinary)
+        np.testing.assert_array_equal(np.concatenate(list(readPuzzleChunks(self.textPath, 5))),
+                                      np.concatenate(list(readPuzzleChunks(binaryPath, 5))))
+
+    def testEmptyCorpus(self):
+        with BinaryCorpusWriter(self.path("empty.sdk"), packed=True):
+            pass
+        self.assertEqual(len(BinaryCorpus(self.path("empty.sdk"))), 0)
+        self.assertEqual(list(readPuzzles(self.path("empty.sdk"))), [])
+
+    def testPackedCells(self):
+        cells = np.random.default_rng(0).integers(0, 10, (100, 81)).astype("uint8")
+        records = packCells(cells)
+        self.assertEqual(records.shape, (100, PACKED_RECORD_SIZE))
+        np.testing.assert_array_equal(unpackCells(records), cells)
+
+    def testRejectsInvalidInput(self):
+        with BinaryCorpusWriter(self.path("invalid.sdk")) as writer:
+            with self.assertRaises(ValueError):
+                writer.write(np.full((9, 9), 10))
+        with self.assertRaises(ValueError):
+            BinaryCorpus(self.textPath)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import glob
+import os
+import unittest
+import numpy as np
+from PuzzleCorpus import parsePuzzle, readPuzzles
+from SudokuSolver import SudokuSolver
+
+PUZZLE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "puzzles")
+
+# a digit given twice in the first row
+DUPLICATE_GIVENS = "1" + "0" * 7 + "1" + "0" * 72
+# no digit is repeated, but the last square of the first row has no candidate left
+NO_CANDIDATE = "12345678" + "0" * 8 + "9" + "0" * 64
+
+
+def readCorpus():
+    return [grid for path in sorted(glob.glob(os.path.join(PUZZLE_DIRECTORY, "*.txt"))) for grid in readPuzzles(path)]
+
+
+class SolverEngineTest(unittest.TestCase):
+    # Every engine has to give the same answers, backtracking is too slow for the corpus itself
+    def assertSolves(self, givens, solution):
+        self.assertTrue(SudokuSolver.isValidPuzzle(solution))
+        self.assertTrue((solution != 0).all())
+        np.testing.assert_array_equal(solution[givens != 0], givens[givens != 0])
+
+    def testCorpusHasOneSolution(self):
+        for engine in ("bitmask", "dlx"):
+            sudokuSolver = SudokuSolver(engine=engine)
+            for givens in readCorpus():
+                solution = np.zeros((9, 9), dtype=int)
+                sudokuSolver.setGrid(givens.copy())
+                self.assertEqual(sudokuSolver.countSolutions(2, solution), 1, engine)
+                self.assertSolves(givens, solution)
+
+                grid = givens.copy()
+                sudokuSolver.setGrid(grid)
+                self.assertTrue(sudokuSolver.solveSudoku(), engine)
+                np.testing.assert_array_equal(grid, solution)
+
+    def testEnginesAgreeOnCounts(self):
+        # corpus solutions with 40 squares cleared again often have more than one solution
+        rng = np.random.default_rng(0)
+        bitmaskSolver = SudokuSolver(engine="bitmask")
+        for givens in readCorpus():
+            grid = givens.copy()
+            bitmaskSolver.setGrid(grid)
+            bitmaskSolver.solveSudoku()
+            grid.flat[rng.choice(81, 40, replace=False)] = 0
+
+            counts = {}
+            for engine in SudokuSolver.ENGINES:
+                sudokuSolver = SudokuSolver(grid.copy(), engine)
+                counts[engine] = sudokuSolver.countSolutions(None)
+                for limit in (1, 2):
+                    solution = np.zeros((9, 9), dtype=int)
+                    self.assertEqual(sudokuSolver.countSolutions(limit, solution), min(limit, counts[engine]), engine)
+                    self.assertSolves(grid, solution)
+            self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def testCountStopsAtLimit(self):
+        for engine in SudokuSolver.ENGINES:
+            grid = np.zeros((9, 9), dtype=int)
+            sudokuSolver = SudokuSolver(grid, engine)
+            for limit in (1, 2, 5):
+                self.assertEqual(sudokuSolver.countSolutions(limit), limit, engine)
+            self.assertFalse(sudokuSolver.hasUniqueSolution())
+            self.assertFalse(grid.any(), "countSolutions changed the grid")
+
+    def testInvalidGivens(self):
+        for engine in SudokuSolver.ENGINES:
+            for text in (DUPLICATE_GIVENS, NO_CANDIDATE):
+                grid = parsePuzzle(text)
+                sudokuSolver = SudokuSolver(grid.copy(), engine)
+                self.assertEqual(sudokuSolver.countSolutions(2), 0, engine)
+                self.assertFalse(sudokuSolver.hasUniqueSolution())
+
+        self.assertFalse(SudokuSolver.isValidPuzzle(parsePuzzle(DUPLICATE_GIVENS)))
+        self.assertEqual(SudokuSolver.getAllConflicts(parsePuzzle(DUPLICATE_GIVENS)), {(0, 0), (0, 8)})
+        self.assertTrue(SudokuSolver.isValidPuzzle(parsePuzzle(NO_CANDIDATE)))
+
+
+if __name__ == "__main__":
+    unittest.main()